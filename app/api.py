@@ -1,7 +1,12 @@
-from fastapi import FastAPI, Request, HTTPException
+import hmac
+from fastapi import FastAPI, Request, HTTPException, Response
 from aiogram import types
-from .telegram import dp, bot
+from .telegram import dp, bot, outbox
 from .config import settings
+from .services.rate_limiter import binance_limiter
+from .services.strategy_guard import strategy_guard
+from .services import profiling
+from . import metrics as prom
 import asyncio
 
 app = FastAPI()
@@ -15,6 +20,48 @@ async def readyz():
     me = await bot.get_me()
     return {"ok": True, "bot": me.username}
 
+@app.get("/limits")
+async def limits():
+    return {"binance": binance_limiter.snapshot()}
+
+@app.get("/outbox")
+async def outbox_stats():
+    return outbox.stats()
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = prom.render()
+    return Response(content=body, media_type=content_type)
+
+def _check_debug_token(request: Request):
+    token = getattr(settings, "DEBUG_TOKEN", None)
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Header only: a query-string token would end up in access logs and browser history
+    given = request.headers.get("x-debug-token") or ""
+    if not hmac.compare_digest(given.encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+@app.get("/debug/strategies")
+async def debug_strategies(request: Request):
+    _check_debug_token(request)
+    return strategy_guard.stats()
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 10.0, mode: str = "cprofile", limit: int = 40,
+                        sort: str = "cumulative"):
+    _check_debug_token(request)
+    seconds = max(0.1, min(seconds, float(getattr(settings, "PROFILE_MAX_SEC", 60.0))))
+    if mode == "sample":
+        return await profiling.sample(seconds, limit=limit)
+    if mode != "cprofile":
+        raise HTTPException(status_code=400, detail="mode must be cprofile or sample")
+    try:
+        text = await profiling.cprofile(seconds, limit=limit, sort=sort)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"unknown sort key: {sort}")
+    return Response(content=text, media_type="text/plain")
+
 @app.post("/webhook")
 async def telegram_webhook(request: Request):
     try:
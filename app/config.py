@@ -17,8 +17,24 @@ class Settings(BaseSettings):
     PUBLIC_URL: Optional[str] = None
     KOYEB_APP_URL: Optional[str] = None
 
-    # Polling cadence
+    # Binance endpoints
+    BINANCE_BASE: str = "https://fapi.binance.com"
+    BINANCE_WS_BASE: str = "wss://fstream.binance.com"
+
+    # Polling cadence: "candle" wakes just after each candle close (plus a grace period,
+    # retrying a few times while the exchange hasn't published it yet); "poll" every POLL_INTERVAL_SEC
+    SCHEDULE_MODE: str = "candle"
     POLL_INTERVAL_SEC: float = 5.0
+    CANDLE_CLOSE_GRACE_MS: int = 1500
+    CANDLE_CLOSE_RETRIES: int = 3
+    CANDLE_RETRY_SEC: float = 1.0
+    TIME_SYNC_SEC: int = 600
+
+    # Market data mode: "rest" (poll klines) or "ws" (combined kline streams)
+    MARKET_DATA_MODE: str = "rest"
+    KLINE_WINDOW: int = 300
+    WS_STREAMS_PER_CONN: int = 200
+    WS_RECONNECT_MAX_DELAY: float = 30.0
 
     # Keepalive ping
     KEEPALIVE_SEC: int = 60
@@ -27,13 +43,77 @@ class Settings(BaseSettings):
     ATR_SL_MULT: float = 1.0
     ATR_TP_MULT: float = 2.0
 
-    # Dedup TTL (seconds)
+    # Dedup TTL (seconds), in-process cache size and behaviour when Redis is unreachable
+    # ("closed" drops the signal, "open" sends it anyway)
     DEDUP_TTL_SEC: int = 3600
+    DEDUP_LOCAL_MAX: int = 100_000
+    DEDUP_FAIL_MODE: str = "closed"
+
+    # Signal persistence (write-behind bulk inserts, Redis spillover)
+    PERSIST_BATCH_SIZE: int = 50
+    PERSIST_FLUSH_SEC: float = 1.0
+    PERSIST_RETRY_MAX: int = 3
+    PERSIST_RETRY_BASE_DELAY: float = 0.5
+    PERSIST_PROBE_SEC: float = 10.0
+
+    # Telegram delivery (TELEGRAM_CHAT_ID may list several ids, comma-separated)
+    TG_CHAT_RATE: float = 1.0
+    TG_GROUP_RATE_PER_MIN: float = 20.0
+    TG_GLOBAL_RATE: float = 30.0
+    TG_SEND_RETRIES: int = 3
+    TG_DRAIN_SEC: float = 5.0
 
     # Network retry knobs (used by Binance client)
+    REQUEST_TIMEOUT: float = 10.0
+
+    # Shared HTTP connection pool (Binance, Supabase, backtests, utilities)
+    HTTP_POOL_LIMIT: int = 100
+    HTTP_POOL_PER_HOST: int = 32
+    HTTP_KEEPALIVE_SEC: float = 30.0
+    HTTP_DNS_TTL_SEC: int = 300
+    HTTP_CONNECT_TIMEOUT: float = 5.0
     RETRY_MAX: int = 3
     RETRY_BASE_DELAY: float = 0.2
 
+    # Binance request-weight budget (per IP, per minute) and worker fan-out
+    BINANCE_WEIGHT_LIMIT: int = 2400
+    BINANCE_WEIGHT_SAFETY: float = 0.8
+    WORKER_CONCURRENCY: int = 8
+    # Strategies with `run_matrix` are evaluated once per timeframe over all symbols
+    MATRIX_EVAL_ENABLED: bool = True
+
+    # Warm start: kline windows and strategy state snapshotted to Redis periodically and on
+    # shutdown, restored on startup so only candles missed while down are fetched
+    SNAPSHOT_ENABLED: bool = True
+    SNAPSHOT_INTERVAL_SEC: float = 60.0
+    SNAPSHOT_TTL_SEC: int = 86400
+
+    # Split (symbol, timeframe) shards between replicas through Redis leases
+    SHARDING_ENABLED: bool = False
+    SHARD_LEASE_SEC: float = 30.0
+    SHARD_HEARTBEAT_SEC: float = 10.0
+    REPLICA_ID: Optional[str] = None
+
+    # Per-call time budget for Strategy.run in the live loop; after STRATEGY_OVERRUN_LIMIT
+    # overruns in a row: "log", "demote" (every STRATEGY_DEMOTE_FACTOR-th candle) or "disable"
+    STRATEGY_BUDGET_MS: float = 50.0
+    STRATEGY_BUDGETS_MS: Dict[str, float] = {}
+    STRATEGY_OVERRUN_LIMIT: int = 5
+    STRATEGY_OVERRUN_ACTION: str = "log"
+    STRATEGY_DEMOTE_FACTOR: int = 4
+
+    # /debug/* endpoints (disabled unless a token is set); send it as X-Debug-Token
+    DEBUG_TOKEN: Optional[str] = None
+    PROFILE_MAX_SEC: float = 60.0
+
+    # Logging: format and write on a background thread; records per second let through
+    # for chatty INFO events, keyed by message or logger name
+    LOG_QUEUE_ENABLED: bool = True
+    LOG_SAMPLE_RATES: Dict[str, float] = {
+        "binance_ticker_price_ok": 1.0,
+        "supabase_insert_response": 1.0,
+    }
+
     # Redis TLS knobs
     REDIS_SSL_VERIFY: bool = True
     REDIS_ALLOW_TLS_DOWNGRADE: bool = False
@@ -46,9 +126,36 @@ class Settings(BaseSettings):
         "four_hour_reentry_5m": True,
     }
 
+    # Local historical kline cache used by backtests
+    KLINE_CACHE_ENABLED: bool = True
+    KLINE_CACHE_DIR: str = "/tmp/klines"
+    HISTORY_CONCURRENCY: int = 4
+
+    # Backtests run in a process pool (0 = one process per CPU)
+    BACKTEST_POOL_ENABLED: bool = True
+    BACKTEST_PROCESSES: int = 0
+
+    # Interactive (/backtest) jobs: concurrent jobs, queue bound, Redis result cache TTL and
+    # the alignment of the data range end (identical requests within it share a cached result)
+    BACKTEST_JOB_WORKERS: int = 2
+    BACKTEST_JOB_QUEUE_MAX: int = 20
+    BACKTEST_CACHE_TTL_SEC: int = 21600
+    BACKTEST_RANGE_ALIGN_SEC: int = 3600
+
     # Default pairs universe
     PAIRS: List[str] = ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
 
+    # Universe: "pairs" (PAIRS) or "usdt_perp" (all trading USDT perpetuals from exchangeInfo),
+    # optionally filtered by the 24h ticker (0 = no filter). Price-only strategies (run_ticker)
+    # are evaluated from one all-symbols ticker call per POLL_INTERVAL_SEC instead of klines.
+    UNIVERSE_MODE: str = "pairs"
+    UNIVERSE_MIN_QUOTE_VOLUME: float = 0.0
+    UNIVERSE_MIN_RANGE_PCT: float = 0.0
+    UNIVERSE_MAX_SYMBOLS: int = 0
+    UNIVERSE_REFRESH_SEC: int = 3600
+    UNIVERSE_STATS_SEC: int = 300
+    TICKER_PREFILTER_ENABLED: bool = True
+
     # Test-strategy controls
     TEST_SIGNAL_ENABLED: bool = True
     TEST_SIGNAL_PRICE: float = 110000.0
@@ -1,7 +1,29 @@
 import logging
+import logging.handlers
+import queue
 import sys
 import json
-from typing import Any, Mapping
+import threading
+import time
+from typing import Any, Dict, Mapping
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+# Record attributes left out of the JSON line: the raw message parts (`msg` is written
+# formatted) and exception state (written as `exc_info`). Everything else, location
+# fields (module, funcName, lineno, pathname, ...) and `extra=` keys alike, is emitted.
+_INTERNAL_ATTRS = frozenset(("args", "msg", "exc_info", "exc_text", "stack_info"))
+
+def _dumps(obj: Dict[str, Any]) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        except (TypeError, orjson.JSONEncodeError):
+            pass  # e.g. ints beyond 64 bits
+    return json.dumps(obj, ensure_ascii=False, default=str)
 
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
@@ -13,17 +35,92 @@ class JsonFormatter(logging.Formatter):
         if record.exc_info:
             base["exc_info"] = self.formatException(record.exc_info)
         for key, value in record.__dict__.items():
-            if key not in ("args", "msg", "exc_info", "exc_text", "stack_info"):
-                try:
-                    json.dumps({key: value})
-                    base[key] = value
-                except Exception:
-                    base[key] = str(value)
-        return json.dumps(base, ensure_ascii=False)
-
-def setup_logging(level: str = "INFO"):
+            if key not in _INTERNAL_ATTRS:
+                base[key] = value
+        return _dumps(base)
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits high-frequency records below WARNING. `rates` maps a message (e.g.
+    "binance_ticker_price_ok") or a logger name to the records per second let through;
+    the next record that passes carries `sampled_out` with the number dropped since.
+    """
+
+    def __init__(self, rates: Mapping[str, float]):
+        super().__init__()
+        self.rates = {k: float(v) for k, v in rates.items() if v is not None}
+        self._next: Dict[str, float] = {}
+        self._dropped: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        key = record.msg if isinstance(record.msg, str) and record.msg in self.rates else record.name
+        rate = self.rates.get(key)
+        if rate is None:
+            return True
+        now = time.monotonic()
+        if rate <= 0 or now < self._next.get(key, 0.0):
+            self._dropped[key] = self._dropped.get(key, 0) + 1
+            return False
+        self._next[key] = now + 1.0 / rate
+        dropped = self._dropped.pop(key, 0)
+        if dropped:
+            record.sampled_out = dropped
+        return True
+
+class _LoopQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # %-args are merged now, while they still hold the values logged: they may be
+        # mutable objects the caller changes afterwards. JSON encoding and traceback
+        # rendering stay on the listener thread; `extra=` values are expected to be
+        # snapshots (the codebase passes fresh dicts and scalars).
+        if record.args:
+            record.msg, record.args = record.getMessage(), None
+        return record
+
+_listener: logging.handlers.QueueListener | None = None
+_lock = threading.Lock()
+
+def setup_logging(level: str = "INFO", queued: bool | None = None, sample_rates: Mapping[str, float] | None = None):
+    """
+    JSON lines on stdout. With `queued` (LOG_QUEUE_ENABLED) records are handed to a
+    background thread that formats and writes them; `sample_rates` (LOG_SAMPLE_RATES)
+    rate-limits chatty INFO/DEBUG events.
+    """
+    global _listener
+    if queued is None or sample_rates is None:
+        from .config import settings
+        if queued is None:
+            queued = getattr(settings, "LOG_QUEUE_ENABLED", True)
+        if sample_rates is None:
+            sample_rates = getattr(settings, "LOG_SAMPLE_RATES", {}) or {}
+    shutdown_logging()
     handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(JsonFormatter())
     root = logging.getLogger()
     root.setLevel(level.upper())
-    root.handlers = [handler]
+    if queued:
+        front = _LoopQueueHandler(queue.SimpleQueue())
+        with _lock:
+            _listener = logging.handlers.QueueListener(front.queue, handler, respect_handler_level=True)
+            _listener.start()
+    else:
+        front = handler
+    if sample_rates:
+        front.addFilter(SamplingFilter(sample_rates))
+    root.handlers = [front]
+
+def shutdown_logging():
+    """Stop the listener thread after it has written everything queued so far; later records are written directly."""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        root = logging.getLogger()
+        filters = [f for h in root.handlers for f in h.filters]
+        root.handlers = list(listener.handlers)
+        for h in root.handlers:
+            for f in filters:
+                h.addFilter(f)
@@ -0,0 +1,39 @@
+"""
+Prometheus metrics for the scan/dispatch hot path, served at GET /metrics.
+
+Hot paths time with `time.perf_counter()` and call `.labels(...).observe()` /
+`.inc()` directly; label values are low-cardinality (strategy, symbol, interval)
+so each call is a dict lookup on the metric's child cache. Queue depths are
+gauges backed by callbacks, read only when Prometheus scrapes.
+"""
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+_NET_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_CPU_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+KLINE_FETCH_SECONDS = Histogram("signal_kline_fetch_seconds", "Binance klines request latency",
+                                ["interval"], buckets=_NET_BUCKETS)
+STRATEGY_RUN_SECONDS = Histogram("signal_strategy_run_seconds", "Strategy.run time per call",
+                                 ["strategy"], buckets=_CPU_BUCKETS)
+REDIS_DEDUP_SECONDS = Histogram("signal_redis_dedup_seconds", "Pipelined Redis SET NX dedup batch latency",
+                                buckets=_NET_BUCKETS)
+SUPABASE_INSERT_SECONDS = Histogram("signal_supabase_insert_seconds", "Supabase bulk insert latency",
+                                    buckets=_NET_BUCKETS)
+HTTP_REQUEST_SECONDS = Histogram("signal_http_request_seconds", "Outgoing HTTP request latency (shared session)",
+                                 ["host", "method", "status"], buckets=_NET_BUCKETS)
+TELEGRAM_SEND_SECONDS = Histogram("signal_telegram_send_seconds", "Telegram sendMessage latency",
+                                  buckets=_NET_BUCKETS)
+
+SIGNALS = Counter("signal_signals_total", "Fresh signals dispatched", ["strategy", "symbol"])
+DEDUP_HITS = Counter("signal_dedup_hits_total", "Signals suppressed as duplicates", ["strategy", "symbol"])
+STRATEGY_ERRORS = Counter("signal_strategy_errors_total", "Strategy evaluation errors", ["strategy", "symbol"])
+ERRORS = Counter("signal_errors_total", "Errors outside strategies", ["component"])
+PERSIST_DEAD_LETTERS = Counter("signal_persist_dead_letters_total", "Signal rows rejected by Supabase and set aside")
+HTTP_CONNECTIONS = Counter("signal_http_connections_total", "New outgoing HTTP connections (handshakes)")
+
+CYCLE_SECONDS = Gauge("signal_cycle_duration_seconds", "Duration of the last scan cycle", ["loop"])
+QUEUE_DEPTH = Gauge("signal_queue_depth", "Items waiting in in-process queues", ["queue"])
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
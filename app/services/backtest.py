@@ -1,83 +1,125 @@
 
-import time, logging
-from typing import List, Dict, Any
+import asyncio, time, logging
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta, timezone
-import aiohttp
 
 from app.config import settings
+from app.services import backtest_pool, http
+from app.services.binance import BinanceClient, interval_ms
+from app.services.history import download_klines
+from app.services.kline_array import KlineArray
+from app.services.kline_cache import kline_cache
+from app.services.touch_index import TouchIndex, TP, SL
 
 log = logging.getLogger("backtest")
 
 def _now_ms(): return int(time.time()*1000)
 def _months_ago_ms(n): return int((datetime.now(tz=timezone.utc)-timedelta(days=30*n)).timestamp()*1000)
 
-async def _fetch_klines(symbol: str, interval: str, months: int=3) -> List[List[Any]]:
-    base = (getattr(settings, "BINANCE_BASE", "https://fapi.binance.com") or "https://fapi.binance.com").rstrip("/")
-    url = f"{base}/fapi/v1/klines"
-    end = _now_ms(); start = _months_ago_ms(months)
-    out: List[List[Any]] = []
-    limit = 1000
-    async with aiohttp.ClientSession() as session:
-        current_end = end
-        guard = 20000
-        while current_end > start and guard > 0:
-            timeout = getattr(settings, "REQUEST_TIMEOUT", 10)
-            params = {"symbol": symbol, "interval": interval, "limit": limit, "endTime": current_end}
-            async with session.get(url, params=params, timeout=timeout) as r:
-                r.raise_for_status()
-                batch = await r.json()
-            if not batch:
-                break
-            out[0:0] = batch
-            first_open = batch[0][0]
-            if first_open <= start: break
-            current_end = first_open - 1
-            guard -= 1
-    return [c for c in out if start <= c[0] <= end]
+def data_range(interval: str, months: int=3, now_ms: int | None = None) -> Tuple[int, int]:
+    """
+    (start, end) of a `months` backtest with the end floored to BACKTEST_RANGE_ALIGN_SEC
+    (and at least to the interval), so requests made close together see the same data.
+    """
+    align = max(int(getattr(settings, "BACKTEST_RANGE_ALIGN_SEC", 3600)) * 1000, interval_ms(interval))
+    end = (now_ms if now_ms is not None else _now_ms()) // align * align
+    return end - months * 30 * 86_400_000, end
+
+_binance: BinanceClient | None = None
+
+def _client() -> BinanceClient:
+    """Binance client for backtest downloads, on the process-wide pooled session."""
+    global _binance
+    session = http.session()
+    if _binance is None or _binance.session is not session:
+        base = getattr(settings, "BINANCE_BASE", "https://fapi.binance.com") or "https://fapi.binance.com"
+        _binance = BinanceClient(base, session)
+    return _binance
+
+async def _download_klines(symbol: str, interval: str, start: int, end: int) -> List[List[Any]]:
+    return await download_klines(_client(), symbol, interval, start, end)
+
+async def _fetch_klines(symbol: str, interval: str, months: int=3, rng: Tuple[int, int] | None = None) -> KlineArray:
+    start, end = rng or (_months_ago_ms(months), _now_ms())
+    if not getattr(settings, "KLINE_CACHE_ENABLED", True):
+        return KlineArray.from_rows(await _download_klines(symbol, interval, start, end))
+    # Only the part of the range missing from the local cache is downloaded
+    return await kline_cache.load(symbol, interval, start, end, _download_klines)
 
 def _default_tp_sl(side: str, entry: float):
     return ((entry*1.01, entry*0.995) if side=="LONG" else (entry*0.99, entry*1.005))
 
-def _hit(side: str, entry: float, tp: float, sl: float, subsequent: List[List[Any]]):
-    for c in subsequent:
-        h = float(c[2]); l = float(c[3])
-        tp_hit = h>=tp if side=="LONG" else l<=tp
-        sl_hit = l<=sl if side=="LONG" else h>=sl
-        if tp_hit and sl_hit: return "SL"
-        if tp_hit: return "TP"
-        if sl_hit: return "SL"
-    return None
-
-async def backtest_strategy(strategy, symbol: str, interval: str, months: int=3) -> Dict[str, Any]:
-    kl = await _fetch_klines(symbol, interval, months)
+def _signals_by_bar(strategy, kl: List[List[Any]], symbol: str, warm: int):
+    """Yield (i, signals) for bars warm..n-2, via `run_batch` when the strategy has one."""
+    if hasattr(strategy, "run_batch"):
+        by_bar = strategy.run_batch(kl, symbol, start=warm) or {}
+        for i in sorted(by_bar):
+            if warm <= i < len(kl) - 1:
+                yield i, by_bar[i]
+        return
+    for i in range(warm, len(kl)-1):
+        window = kl[:i+1]
+        yield i, strategy.run(window, symbol) or []
+
+def backtest_klines(strategy, symbol: str, kl: List[List[Any]], arr: KlineArray | None = None) -> Dict[str, Any]:
     if len(kl) < 200:
         return {"symbol": symbol, "trades": 0, "wins": 0, "winrate": 0.0}
-    trades=wins=0
     warm=100
-    for i in range(warm, len(kl)-1):
-        window = kl[:i+1]
-        signals = strategy.run(window, symbol) or []
+    longs: List[bool] = []; starts: List[int] = []; tps: List[float] = []; sls: List[float] = []
+    for i, signals in _signals_by_bar(strategy, kl, symbol, warm):
         if not signals: continue
         sig = signals[0]
         side = sig.get("side")
         if side not in ("LONG","SHORT"): continue
-        entry = float(sig.get("entry") or window[-1][4])
+        entry = float(sig.get("entry") or kl[i][4])
         tp = float(sig.get("tp") or _default_tp_sl(side, entry)[0])
         sl = float(sig.get("sl") or _default_tp_sl(side, entry)[1])
-        outcome = _hit(side, entry, tp, sl, kl[i+1:])
-        if outcome:
-            trades += 1
-            if outcome=="TP": wins += 1
+        longs.append(side=="LONG"); starts.append(i+1); tps.append(tp); sls.append(sl)
+    # Resolve every signal's first TP/SL touch in one batched lookup
+    if arr is None:
+        arr = KlineArray.from_rows(kl)
+    outcomes = TouchIndex(arr.high, arr.low).resolve(longs, starts, tps, sls)
+    wins = int((outcomes == TP).sum())
+    trades = wins + int((outcomes == SL).sum())
     winrate = (wins/trades*100.0) if trades else 0.0
     return {"symbol": symbol, "trades": trades, "wins": wins, "winrate": round(winrate,2)}
 
-async def run_backtest(strategy_name: str, strategy, pairs: List[str], interval: str, months: int=3) -> Dict[str, Any]:
+async def backtest_strategy(strategy, symbol: str, interval: str, months: int=3, strategy_name: str | None = None,
+                            rng: Tuple[int, int] | None = None) -> Dict[str, Any]:
+    arr = await _fetch_klines(symbol, interval, months, rng)
+    # CPU-bound part runs off the event loop so live scanning and webhooks keep flowing
+    return await backtest_pool.run_symbol(strategy_name or getattr(strategy, "name", ""), strategy, symbol, arr)
+
+Progress = Callable[[str, Dict[str, Any] | None, int, int], Awaitable[None]]
+
+async def run_backtest(strategy_name: str, strategy, pairs: List[str], interval: str, months: int=3,
+                       progress: Optional[Progress] = None, rng: Tuple[int, int] | None = None) -> Dict[str, Any]:
+    """
+    Backtest every pair concurrently. `progress(symbol, result, done, total)` is awaited as
+    each symbol finishes (result None on error); `rng` pins the (start, end) data range.
+    """
     per={}; T=W=0
-    for sym in pairs:
+    done = 0
+
+    async def one(sym):
+        nonlocal done
         try:
-            r = await backtest_strategy(strategy, sym, interval, months=months)
-            per[sym]=r; T+=r["trades"]; W+=r["wins"]
+            r = await backtest_strategy(strategy, sym, interval, months=months, strategy_name=strategy_name, rng=rng)
         except Exception as e:
-            log.exception("backtest_error", extra={"symbol": sym, "error": str(e)})
+            r = e
+        done += 1
+        if progress is not None:
+            try:
+                await progress(sym, None if isinstance(r, BaseException) else r, done, len(pairs))
+            except Exception as e:
+                log.warning("backtest_progress_error", extra={"symbol": sym, "error": str(e)})
+        return r
+
+    results = await asyncio.gather(*(one(sym) for sym in pairs))
+    for sym, r in zip(pairs, results):
+        if isinstance(r, BaseException):
+            log.error("backtest_error", extra={"symbol": sym, "error": str(r)}, exc_info=r)
+            continue
+        per[sym]=r; T+=r["trades"]; W+=r["wins"]
     winrate = (W/T*100.0) if T else 0.0
     return {"strategy": strategy_name, "interval": interval, "trades": T, "wins": W, "winrate": round(winrate,2), "per_symbol": per}
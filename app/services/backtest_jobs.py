@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import importlib
+import inspect
+import json
+import logging
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from ..config import settings
+from . import backtest
+
+log = logging.getLogger("backtest_jobs")
+
+Listener = Callable[[str, Dict[str, Any] | None, int, int], Awaitable[None]]
+
+# Modules whose changes invalidate every cached result: the engine and what strategies
+# compute with. Keep in sync with the imports of backtest.py and the strategies: a module
+# that changes signals, fills or the data a run sees (indicators, session filters,
+# history download, kline cache coverage and gap filling) belongs here.
+_ENGINE_MODULES = (
+    "app.services.backtest", "app.services.backtest_pool", "app.services.touch_index",
+    "app.services.kline_array", "app.services.kline_matrix", "app.services.history", "app.services.kline_cache",
+    "app.services.indicators", "app.services.indicators_np", "app.services.sessions",
+)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class _Job:
+    __slots__ = ("key", "name", "strategy", "pairs", "interval", "months", "rng", "future", "listeners")
+
+    def __init__(self, key, name, strategy, pairs, interval, months, rng):
+        self.key = key
+        self.name = name
+        self.strategy = strategy
+        self.pairs = pairs
+        self.interval = interval
+        self.months = months
+        self.rng = rng
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.listeners: List[Listener] = []
+
+    async def progress(self, symbol, result, done, total):
+        for cb in list(self.listeners):
+            try:
+                await cb(symbol, result, done, total)
+            except Exception as e:
+                log.warning("backtest_listener_error", extra={"job": self.key, "error": str(e)})
+
+
+def _module_source(module_name: str) -> bytes:
+    try:
+        # Imported if needed, so the key doesn't depend on what this process happened to load
+        mod = sys.modules.get(module_name) or importlib.import_module(module_name)
+        return inspect.getsource(mod).encode()
+    except (ImportError, OSError, TypeError):
+        return b""
+
+
+_versions: Dict[type, str] = {}
+
+
+def code_version(strategy) -> str:
+    """SHA-1 over the strategy's module source (and a wrapped `inner`'s) plus the backtest engine."""
+    cls = type(strategy)
+    version = _versions.get(cls)
+    if version is None:
+        h = hashlib.sha1()
+        modules = [cls.__module__]
+        inner = getattr(strategy, "inner", None)
+        if inner is not None:
+            modules.append(type(inner).__module__)
+        for name in modules + list(_ENGINE_MODULES):
+            h.update(name.encode())
+            h.update(_module_source(name))
+        version = _versions[cls] = h.hexdigest()[:12]
+    return version
+
+
+def cache_key(name: str, strategy, pairs: List[str], interval: str, rng: Tuple[int, int]) -> str:
+    pairs_part = hashlib.sha1(",".join(sorted(pairs)).encode()).hexdigest()[:12]
+    return f"backtest:result:{name}:{code_version(strategy)}:{interval}:{pairs_part}:{rng[0]}-{rng[1]}"
+
+
+class BacktestJobs:
+    """
+    Queue for interactive backtests.
+
+    At most BACKTEST_JOB_WORKERS jobs run at once and BACKTEST_JOB_QUEUE_MAX may wait
+    (`submit` raises QueueFull beyond that). A job is keyed by strategy name, code
+    version, pairs, interval and the aligned data range (`backtest.data_range`):
+    a request identical to one in flight joins it and gets the same per-symbol
+    progress; a finished result is cached in Redis for BACKTEST_CACHE_TTL_SEC and
+    returned straight away (with "cached": True) by later requests.
+    """
+
+    def __init__(self, redis=None, workers: int | None = None, queue_max: int | None = None, ttl: int | None = None):
+        self._redis = redis
+        self.workers = max(1, int(workers or getattr(settings, "BACKTEST_JOB_WORKERS", 2)))
+        self.queue_max = int(queue_max or getattr(settings, "BACKTEST_JOB_QUEUE_MAX", 20))
+        self.ttl = int(ttl or getattr(settings, "BACKTEST_CACHE_TTL_SEC", 21600))
+        self._queue: asyncio.Queue | None = None
+        self._tasks: List[asyncio.Task] = []
+        self._inflight: Dict[str, _Job] = {}
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from .redis_queue import RedisClient
+            self._redis = RedisClient()
+        return self._redis
+
+    def _start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._tasks = [t for t in self._tasks if not t.done()]
+        for i in range(len(self._tasks), self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"backtest-job-{i}"))
+
+    async def _cache_get(self, key: str) -> Dict[str, Any] | None:
+        try:
+            raw = await self.redis.r.get(key)
+        except Exception as e:
+            log.warning("backtest_cache_get_error", extra={"key": key, "error": str(e)})
+            return None
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    async def submit(self, name: str, strategy, pairs: List[str], interval: str, months: int = 3,
+                     on_progress: Listener | None = None) -> Dict[str, Any]:
+        rng = backtest.data_range(interval, months)
+        key = cache_key(name, strategy, pairs, interval, rng)
+        cached = await self._cache_get(key)
+        if cached is not None:
+            log.info("backtest_cache_hit", extra={"strategy": name, "key": key})
+            return {**cached, "cached": True}
+
+        job = self._inflight.get(key)
+        if job is None:
+            self._start()
+            if self._queue.qsize() >= self.queue_max:
+                raise QueueFull(f"{self._queue.qsize()} backtests already queued")
+            job = self._inflight[key] = _Job(key, name, strategy, list(pairs), interval, months, rng)
+            self._queue.put_nowait(job)
+            log.info("backtest_job_queued", extra={"strategy": name, "key": key, "queued": self._queue.qsize()})
+        else:
+            log.info("backtest_job_joined", extra={"strategy": name, "key": key})
+        if on_progress is not None:
+            job.listeners.append(on_progress)
+        try:
+            # shield: one requester going away must not cancel the job for the others
+            return await asyncio.shield(job.future)
+        finally:
+            if on_progress is not None and on_progress in job.listeners:
+                job.listeners.remove(on_progress)
+
+    async def _worker(self):
+        while True:
+            job: _Job = await self._queue.get()
+            try:
+                res = await backtest.run_backtest(job.name, job.strategy, job.pairs, job.interval,
+                                                  months=job.months, progress=job.progress, rng=job.rng)
+                res["range"] = list(job.rng)
+                if len(res["per_symbol"]) == len(job.pairs):  # partial results are not cached
+                    await self.redis.cache_set(job.key, json.dumps(res), ttl=self.ttl)
+                job.future.set_result(res)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as e:
+                log.exception("backtest_job_failed", extra={"strategy": job.name, "error": str(e)})
+                job.future.set_exception(e)
+            finally:
+                self._inflight.pop(job.key, None)
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": len([t for t in self._tasks if not t.done()]),
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "inflight": len(self._inflight)}
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._inflight.values():
+            if not job.future.done():
+                job.future.cancel()
+        self._inflight.clear()
+        self._queue = None
+
+
+backtest_jobs = BacktestJobs()
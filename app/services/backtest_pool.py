@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict
+
+import numpy as np
+
+from ..config import settings
+from .kline_array import RECORD_DTYPE, KlineArray
+
+log = logging.getLogger("backtest_pool")
+
+_pool: ProcessPoolExecutor | None = None
+
+# Per-process strategy instances, loaded by name in each pool worker
+_strategies: Dict[str, Any] | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        n = int(getattr(settings, "BACKTEST_PROCESSES", 0) or 0) or (os.cpu_count() or 1)
+        # spawn: never fork a process that is running an event loop and client sessions
+        _pool = ProcessPoolExecutor(max_workers=n, mp_context=mp.get_context("spawn"))
+        log.info("backtest_pool_started", extra={"processes": n})
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _strategy(name: str):
+    global _strategies
+    if _strategies is None:
+        from .strategies.loader import load_all
+        _strategies = load_all()
+    return _strategies.get(name)
+
+
+def _run_task(strategy_name: str, symbol: str, shm_name: str, n: int) -> Dict[str, Any]:
+    """Pool worker: attach to the shared candle block, run one (strategy, symbol) backtest."""
+    from .backtest import backtest_klines
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        rec = np.ndarray((n,), dtype=RECORD_DTYPE, buffer=shm.buf)
+        arr = KlineArray.from_records(rec)  # copies out, so the block can be released
+    finally:
+        shm.close()
+    strat = _strategy(strategy_name)
+    if strat is None:
+        raise LookupError(f"strategy '{strategy_name}' not found in pool worker")
+    return backtest_klines(strat, symbol, arr.to_rows(), arr)
+
+
+class _SharedKlines:
+    """Candles published once into a shared memory block for pool workers to attach to."""
+
+    def __init__(self, arr: KlineArray):
+        rec = arr.to_records()
+        self.n = len(rec)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, rec.nbytes))
+        np.ndarray(rec.shape, dtype=RECORD_DTYPE, buffer=self.shm.buf)[:] = rec
+
+    def release(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+
+async def run_symbol(strategy_name: str, strategy, symbol: str, arr: KlineArray) -> Dict[str, Any]:
+    """
+    Backtest one (strategy, symbol) off the event loop.
+
+    Runs in the process pool when BACKTEST_POOL_ENABLED, otherwise (or if the strategy
+    can't be loaded by name in a worker) in a thread so the loop keeps serving.
+    """
+    from .backtest import backtest_klines
+    loop = asyncio.get_running_loop()
+    if getattr(settings, "BACKTEST_POOL_ENABLED", True):
+        shared = _SharedKlines(arr)
+        try:
+            return await loop.run_in_executor(_get_pool(), _run_task, strategy_name, symbol, shared.shm.name, shared.n)
+        except LookupError:
+            log.warning("backtest_pool_strategy_missing", extra={"strategy": strategy_name})
+        finally:
+            shared.release()
+    return await asyncio.to_thread(backtest_klines, strategy, symbol, arr.to_rows(), arr)
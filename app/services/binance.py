@@ -1,21 +1,50 @@
 import logging
 import aiohttp
 import time
-from typing import Any, List
-from tenacity import retry, stop_after_attempt, wait_exponential_jitter
+from typing import Any, Dict, List, Optional, Tuple
 from ..config import settings
+from .. import metrics
+from . import http
+from .http import retrying
+from .kline_array import KlineArray
+from .rate_limiter import BinanceWeightLimiter, binance_limiter
 log = logging.getLogger('binance')
 
+_INTERVAL_UNITS_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+def interval_ms(interval: str) -> int:
+    """
+    Length of a Binance kline interval ("1m", "4h", "1d", ...) in milliseconds.
+
+    Only fixed-length intervals are supported: monthly candles ("1M") follow the
+    calendar, which the epoch-aligned boundaries of the cache, history paging and
+    candle scheduler can't express, so they are rejected with ValueError.
+    """
+    unit = _INTERVAL_UNITS_MS.get(interval[-1:])
+    if unit is None or not interval[:-1].isdigit():
+        raise ValueError(f"unsupported kline interval {interval!r} (use m, h, d or w, e.g. '5m', '4h', '1d')")
+    return int(interval[:-1]) * unit
+
 class BinanceClient:
-    def __init__(self, base: str, session: aiohttp.ClientSession):
+    def __init__(self, base: str, session: Optional[aiohttp.ClientSession] = None, limiter: Optional[BinanceWeightLimiter] = None):
         self.base = base.rstrip('/')
-        self.session = session
+        self.session = session or http.session()
+        self.limiter = limiter or binance_limiter
         self._time_offset_ms = 0
 
+    def _observe(self, r: aiohttp.ClientResponse):
+        self.limiter.update_from_headers(r.headers)
+        if r.status in (429, 418):
+            retry_after = r.headers.get("Retry-After")
+            self.limiter.penalize(float(retry_after) if retry_after else None)
+            raise RuntimeError(f"binance_rate_limit status={r.status}")
+
     async def sync_time(self):
         start = time.time(); log.info('binance_sync_time_start', extra={'url': f'{self.base}/fapi/v1/time'})
         url = f"{self.base}/fapi/v1/time"
-        async with self.session.get(url, timeout=settings.REQUEST_TIMEOUT) as r:
+        await self.limiter.acquire("/fapi/v1/time")
+        async with self.session.get(url, timeout=http.timeout()) as r:
+            self._observe(r)
             r.raise_for_status()
             data = await r.json()
             log.info('binance_sync_time_ok', extra={'delta_ms': data.get('serverTime', 0) - int(time.time()*1000), 'status': r.status, 'elapsed_ms': int((time.time()-start)*1000)})
@@ -26,24 +55,37 @@ class BinanceClient:
     def _timestamp(self) -> int:
         return int(time.time() * 1000) + self._time_offset_ms
 
-    @retry(stop=stop_after_attempt(settings.RETRY_MAX),
-           wait=wait_exponential_jitter(initial=settings.RETRY_BASE_DELAY, max=8))
-    async def klines(self, symbol: str, interval: str, limit: int = 150) -> List[List[Any]]:
+    @retrying()
+    async def klines(self, symbol: str, interval: str, limit: int = 150,
+                     start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[List[Any]]:
         url = f"{self.base}/fapi/v1/klines"
         params = {"symbol": symbol, "interval": interval, "limit": limit}
-        async with self.session.get(url, params=params, timeout=settings.REQUEST_TIMEOUT) as r:
-            if r.status in (429, 418):
-                raise RuntimeError(f"binance_rate_limit status={r.status}")
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        await self.limiter.acquire("/fapi/v1/klines", params)
+        t0 = time.perf_counter()
+        async with self.session.get(url, params=params, timeout=http.timeout()) as r:
+            self._observe(r)
             r.raise_for_status()
-            return await r.json()
+            rows = await r.json()
+        metrics.KLINE_FETCH_SECONDS.labels(interval).observe(time.perf_counter() - t0)
+        return rows
+
+    async def klines_array(self, symbol: str, interval: str, limit: int = 150,
+                           start_time: Optional[int] = None, end_time: Optional[int] = None) -> KlineArray:
+        rows = await self.klines(symbol, interval, limit=limit, start_time=start_time, end_time=end_time)
+        return KlineArray.from_rows(rows)
 
-    @retry(stop=stop_after_attempt(settings.RETRY_MAX),
-           wait=wait_exponential_jitter(initial=settings.RETRY_BASE_DELAY, max=8))
+    @retrying()
     async def ticker_price(self, symbol: str) -> float:
         t0 = time.time()
         url = f"{self.base}/fapi/v1/ticker/price"
         params = {"symbol": symbol}
-        async with self.session.get(url, params=params, timeout=5) as r:
+        await self.limiter.acquire("/fapi/v1/ticker/price", params)
+        async with self.session.get(url, params=params, timeout=http.timeout(5)) as r:
+            self._observe(r)
             # Let non-200 raise for visibility
             r.raise_for_status()
             data = await r.json()
@@ -53,3 +95,34 @@ class BinanceClient:
             except Exception:
                 pass
             return price
+
+    @retrying()
+    async def ticker_prices(self) -> Dict[str, Tuple[float, int]]:
+        """Last price of every symbol in one call (weight 2): {symbol: (price, time_ms)}."""
+        url = f"{self.base}/fapi/v1/ticker/price"
+        await self.limiter.acquire("/fapi/v1/ticker/price")
+        async with self.session.get(url, timeout=http.timeout()) as r:
+            self._observe(r)
+            r.raise_for_status()
+            data = await r.json()
+        now = self._timestamp()
+        return {d["symbol"]: (float(d["price"]), int(d.get("time") or now)) for d in data}
+
+    @retrying()
+    async def ticker_24hr(self) -> List[Dict[str, Any]]:
+        """Rolling 24h statistics of every symbol (weight 40)."""
+        url = f"{self.base}/fapi/v1/ticker/24hr"
+        await self.limiter.acquire("/fapi/v1/ticker/24hr")
+        async with self.session.get(url, timeout=http.timeout()) as r:
+            self._observe(r)
+            r.raise_for_status()
+            return await r.json()
+
+    @retrying()
+    async def exchange_info(self) -> Dict[str, Any]:
+        url = f"{self.base}/fapi/v1/exchangeInfo"
+        await self.limiter.acquire("/fapi/v1/exchangeInfo")
+        async with self.session.get(url, timeout=http.timeout()) as r:
+            self._observe(r)
+            r.raise_for_status()
+            return await r.json()
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+import aiohttp
+
+from ..config import settings
+from .binance import BinanceClient
+from .kline_store import KlineStore
+
+log = logging.getLogger("binance_ws")
+
+Kline = List[Any]
+StreamKey = Tuple[str, str]  # (symbol, interval)
+OnClosed = Callable[[str, str, List[Kline]], Awaitable[None]]
+
+
+def stream_name(symbol: str, interval: str) -> str:
+    return f"{symbol.lower()}@kline_{interval}"
+
+
+def ws_kline_to_row(k: Dict[str, Any]) -> Kline:
+    """Convert the `k` payload of a kline stream event into a REST-shaped kline row."""
+    return [k["t"], k["o"], k["h"], k["l"], k["c"], k["v"], k["T"], k["q"], k["n"], k["V"], k["Q"], k.get("B", "0")]
+
+
+class KlineStreamManager:
+    """
+    Keeps rolling kline windows fresh from Binance futures combined kline streams.
+
+    Streams are multiplexed `WS_STREAMS_PER_CONN` per connection. `on_closed(symbol, interval, window)`
+    fires once per final candle (`x=true`) with the window ending at that candle. After a reconnect the
+    windows are backfilled over REST so candles missed while disconnected are not lost.
+    """
+
+    def __init__(self, binance: BinanceClient, session: aiohttp.ClientSession,
+                 keys: Iterable[StreamKey], on_closed: OnClosed, store: KlineStore | None = None,
+                 base: str | None = None, streams_per_conn: int | None = None):
+        self.binance = binance
+        self.session = session
+        self.keys: List[StreamKey] = list(dict.fromkeys(keys))
+        self.on_closed = on_closed
+        self.store = store or KlineStore()
+        self.base = (base or settings.BINANCE_WS_BASE).rstrip("/")
+        self.streams_per_conn = max(1, streams_per_conn or settings.WS_STREAMS_PER_CONN)
+        self._last_closed: Dict[StreamKey, int] = {}
+        self._by_stream: Dict[str, StreamKey] = {stream_name(*k): k for k in self.keys}
+
+    def chunks(self) -> List[List[StreamKey]]:
+        n = self.streams_per_conn
+        return [self.keys[i:i + n] for i in range(0, len(self.keys), n)]
+
+    def url_for(self, keys: List[StreamKey]) -> str:
+        return f"{self.base}/stream?streams=" + "/".join(stream_name(*k) for k in keys)
+
+    async def run(self, stop_event: asyncio.Event):
+        await self.backfill(self.keys, fire=False)
+        tasks = [asyncio.create_task(self._conn_loop(chunk, stop_event)) for chunk in self.chunks()]
+        try:
+            await stop_event.wait()
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def backfill(self, keys: Iterable[StreamKey], fire: bool = True):
+        """Fetch the klines missed since the last stored bar over REST and merge them into the store."""
+        for key in keys:
+            symbol, interval = key
+            try:
+                series = await self.store.refresh(self.binance, symbol, interval)
+            except Exception as e:
+                log.warning("ws_backfill_error", extra={"symbol": symbol, "interval": interval, "error": str(e)})
+                continue
+            log.info("ws_backfill_ok", extra={"symbol": symbol, "interval": interval, "rows": len(series)})
+            await self._fire_latest_closed(key, fire)
+
+    async def _fire_latest_closed(self, key: StreamKey, fire: bool):
+        win = self.store.window(*key)
+        now = self.binance._timestamp()
+        idx = len(win) - 1
+        while idx >= 0 and int(win[idx][6]) >= now:
+            idx -= 1  # skip the in-progress candle
+        if idx < 0:
+            return
+        open_t = win[idx][0]
+        if open_t <= self._last_closed.get(key, -1):
+            return
+        self._last_closed[key] = open_t
+        if fire:
+            await self._emit(key, win[:idx + 1])
+
+    async def _emit(self, key: StreamKey, closed: List[Kline]):
+        try:
+            await self.on_closed(key[0], key[1], closed)
+        except Exception:
+            log.exception("ws_on_closed_error", extra={"symbol": key[0], "interval": key[1]})
+
+    async def handle_message(self, raw: str):
+        msg = json.loads(raw)
+        data = msg.get("data") or {}
+        key = self._by_stream.get(msg.get("stream", ""))
+        k = data.get("k")
+        if key is None or not k:
+            return
+        row = ws_kline_to_row(k)
+        series = self.store.series(*key)
+        series.merge((row,))
+        if k.get("x") and row[0] > self._last_closed.get(key, -1):
+            self._last_closed[key] = row[0]
+            await self._emit(key, series.window())
+
+    async def _conn_loop(self, keys: List[StreamKey], stop_event: asyncio.Event):
+        url = self.url_for(keys)
+        attempt = 0
+        max_delay = getattr(settings, "WS_RECONNECT_MAX_DELAY", 30.0)
+        while not stop_event.is_set():
+            try:
+                async with self.session.ws_connect(url, heartbeat=30) as ws:
+                    log.info("ws_connected", extra={"streams": len(keys)})
+                    if attempt:
+                        await self.backfill(keys)
+                    attempt = 0
+                    async for m in ws:
+                        if m.type == aiohttp.WSMsgType.TEXT:
+                            await self.handle_message(m.data)
+                        elif m.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("ws_error", extra={"streams": len(keys), "error": str(e)})
+            if stop_event.is_set():
+                break
+            attempt += 1
+            delay = min(max_delay, 0.5 * 2 ** min(attempt, 8)) * (0.5 + random.random() / 2)
+            log.info("ws_reconnect", extra={"streams": len(keys), "attempt": attempt, "delay_s": round(delay, 2)})
+            await asyncio.sleep(delay)
@@ -0,0 +1,89 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from ..config import settings
+from .. import metrics
+from .redis_queue import RedisClient, dedup_fails_open
+
+log = logging.getLogger("dedup")
+
+
+class Deduper:
+    """
+    Signal dedup with an in-process TTL/LRU set in front of Redis.
+
+    Strategies re-fire on the same candle every poll, so most checks are repeats;
+    those are answered locally without touching the network. Keys not seen locally
+    are claimed in Redis with one pipelined SET NX batch per call. Both outcomes
+    (claimed by us or already claimed elsewhere) are cached until the dedup TTL.
+
+    When Redis fails, DEDUP_FAIL_MODE decides: "open" treats the keys as fresh
+    (and caches them, so a signal is sent once); "closed" treats them as duplicates
+    without caching, so they are retried on the next cycle.
+    """
+
+    def __init__(self, redis: RedisClient, ttl: int | None = None, max_keys: int | None = None,
+                 fail_open: bool | None = None):
+        self.redis = redis
+        self.ttl = int(ttl or getattr(settings, "DEDUP_TTL_SEC", 3600))
+        self.max_keys = int(max_keys or getattr(settings, "DEDUP_LOCAL_MAX", 100_000))
+        self.fail_open = dedup_fails_open() if fail_open is None else fail_open
+        self._seen: "OrderedDict[str, float]" = OrderedDict()  # key -> expiry (monotonic)
+        self.local_hits = 0
+        self.remote_checks = 0
+        self.remote_errors = 0
+
+    def _seen_locally(self, key: str, now: float) -> bool:
+        exp = self._seen.get(key)
+        if exp is None:
+            return False
+        if exp <= now:
+            del self._seen[key]
+            return False
+        self._seen.move_to_end(key)
+        return True
+
+    def _remember(self, key: str, now: float) -> None:
+        self._seen[key] = now + self.ttl
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+
+    async def check_many(self, keys: List[str]) -> List[bool]:
+        """True for each key seen for the first time (within the batch too)."""
+        now = time.monotonic()
+        out = [False] * len(keys)
+        misses: Dict[str, int] = {}
+        for i, key in enumerate(keys):
+            if key in misses or self._seen_locally(key, now):
+                self.local_hits += 1
+                continue
+            misses[key] = i
+        if not misses:
+            return out
+        pending = list(misses)
+        self.remote_checks += len(pending)
+        t0 = time.perf_counter()
+        try:
+            fresh = await self.redis.set_nx_many(pending, self.ttl)
+            metrics.REDIS_DEDUP_SECONDS.observe(time.perf_counter() - t0)
+        except Exception as e:
+            self.remote_errors += 1
+            metrics.ERRORS.labels("redis_dedup").inc()
+            log.error("dedup_redis_error", extra={"keys": len(pending), "fail_open": self.fail_open, "error": str(e)})
+            if not self.fail_open:
+                return out
+            fresh = [True] * len(pending)
+        for key, is_fresh in zip(pending, fresh):
+            self._remember(key, now)
+            out[misses[key]] = is_fresh
+        return out
+
+    async def check(self, key: str) -> bool:
+        return (await self.check_many([key]))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"local_keys": len(self._seen), "local_hits": self.local_hits,
+                "remote_checks": self.remote_checks, "remote_errors": self.remote_errors}
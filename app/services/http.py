@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+from typing import Callable, List
+
+import aiohttp
+from tenacity import retry, stop_after_attempt, wait_exponential_jitter
+
+from ..config import settings
+from .. import metrics
+
+log = logging.getLogger("http")
+
+# Called after every request with (method, host, status, elapsed_s); status 0 = no response
+TimingHook = Callable[[str, str, int, float], None]
+timing_hooks: List[TimingHook] = []
+
+_session: aiohttp.ClientSession | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def retrying(**overrides):
+    """Retry policy for idempotent requests: RETRY_MAX attempts, jittered exponential backoff."""
+    kwargs = dict(stop=stop_after_attempt(settings.RETRY_MAX),
+                  wait=wait_exponential_jitter(initial=settings.RETRY_BASE_DELAY, max=8))
+    kwargs.update(overrides)
+    return retry(**kwargs)
+
+
+def timeout(total: float | None = None) -> aiohttp.ClientTimeout:
+    return aiohttp.ClientTimeout(total=total if total is not None else settings.REQUEST_TIMEOUT,
+                                 connect=getattr(settings, "HTTP_CONNECT_TIMEOUT", 5.0))
+
+
+def _observe(method: str, host: str, status: int, elapsed: float) -> None:
+    metrics.HTTP_REQUEST_SECONDS.labels(host, method, str(status)).observe(elapsed)
+    for hook in timing_hooks:
+        try:
+            hook(method, host, status, elapsed)
+        except Exception:
+            log.debug("http_timing_hook_error", exc_info=True)
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    async def on_start(session, ctx: SimpleNamespace, params):
+        ctx.t0 = time.perf_counter()
+
+    async def on_end(session, ctx: SimpleNamespace, params):
+        _observe(params.method, params.url.host or "", params.response.status, time.perf_counter() - ctx.t0)
+
+    async def on_exception(session, ctx: SimpleNamespace, params):
+        _observe(params.method, params.url.host or "", 0, time.perf_counter() - ctx.t0)
+
+    async def on_connection(session, ctx: SimpleNamespace, params):
+        # A new connection means a TCP (and usually TLS) handshake; reused ones don't show up here
+        metrics.HTTP_CONNECTIONS.inc()
+
+    tc = aiohttp.TraceConfig()
+    tc.on_request_start.append(on_start)
+    tc.on_request_end.append(on_end)
+    tc.on_request_exception.append(on_exception)
+    tc.on_connection_create_end.append(on_connection)
+    return tc
+
+
+def session() -> aiohttp.ClientSession:
+    """
+    The process-wide client session, created on first use on the running loop.
+
+    One TCPConnector serves every caller (Binance REST and WS, Supabase, backtest
+    downloads, utilities), so connections and TLS sessions are reused across them:
+    HTTP_POOL_LIMIT connections in total, HTTP_POOL_PER_HOST per host, idle ones kept
+    for HTTP_KEEPALIVE_SEC, DNS answers cached for HTTP_DNS_TTL_SEC. Requests get
+    REQUEST_TIMEOUT unless they pass their own.
+    """
+    global _session, _loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=int(getattr(settings, "HTTP_POOL_LIMIT", 100)),
+            limit_per_host=int(getattr(settings, "HTTP_POOL_PER_HOST", 32)),
+            ttl_dns_cache=int(getattr(settings, "HTTP_DNS_TTL_SEC", 300)),
+            use_dns_cache=True,
+            keepalive_timeout=float(getattr(settings, "HTTP_KEEPALIVE_SEC", 30.0)),
+        )
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout(), trace_configs=[_trace_config()])
+        _loop = loop
+        log.info("http_session_created", extra={"limit": connector.limit, "limit_per_host": connector.limit_per_host})
+    return _session
+
+
+async def close() -> None:
+    global _session, _loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session, _loop = None, None
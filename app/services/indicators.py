@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 def ema(series: List[float], period: int) -> List[float]:
     if not series or period <= 1:
@@ -44,3 +44,100 @@ def atr(kl: List[List], period: int = 14) -> List[float]:
         prev = (prev*(period-1) + tr) / period
         atr_vals.append(prev)
     return atr_vals
+
+
+# --- Streaming (incremental) indicators ---------------------------------------
+# O(1) per bar. Fed the same values, they reproduce `ema` / `true_range` / `atr`
+# exactly: the seed is the same `sum(...) / period` and the recurrences are the
+# same expressions. `replace` revises the last bar (e.g. an in-progress candle).
+
+class EMA:
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2 / (period + 1)
+        self.value: Optional[float] = None  # EMA at the last bar
+        self.prev: Optional[float] = None   # EMA at the bar before it
+        self._seed: List[float] = []
+        self._undo: Optional[tuple] = None
+
+    def update(self, price: float) -> Optional[float]:
+        self._undo = (self.value, self.prev, len(self._seed))
+        self.prev = self.value
+        if self.period <= 1:
+            self.value = price
+        elif self.value is not None:
+            self.value = price * self.k + self.value * (1 - self.k)
+        else:
+            self._seed.append(price)
+            if len(self._seed) == self.period:
+                self.value = sum(self._seed) / self.period
+        return self.value
+
+    def replace(self, price: float) -> Optional[float]:
+        if self._undo is None:
+            return self.update(price)
+        self.value, self.prev, n_seed = self._undo
+        del self._seed[n_seed:]
+        return self.update(price)
+
+
+class TrueRange:
+    def __init__(self):
+        self.value: Optional[float] = None
+        self._prev_close: Optional[float] = None
+        self._undo: Optional[tuple] = None
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self._undo = (self.value, self._prev_close)
+        prev_close = self._prev_close
+        if prev_close is None:
+            self.value = high - low
+        else:
+            self.value = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        self._prev_close = close
+        return self.value
+
+    def replace(self, high: float, low: float, close: float) -> float:
+        if self._undo is not None:
+            self.value, self._prev_close = self._undo
+        return self.update(high, low, close)
+
+
+class ATR:
+    """Wilder's ATR over `TrueRange`, matching `atr`."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.tr = TrueRange()
+        self.value: Optional[float] = None
+        self._seed: List[float] = []
+        self._undo: Optional[tuple] = None
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        tr = self.tr.update(high, low, close)
+        self._update_tr(tr)
+        return self.value
+
+    def _update_tr(self, tr: float) -> None:
+        self._undo = (self.value, len(self._seed))
+        if self.value is not None:
+            self.value = (self.value * (self.period - 1) + tr) / self.period
+        else:
+            self._seed.append(tr)
+            if len(self._seed) == self.period:
+                self.value = sum(self._seed) / self.period
+
+    def replace(self, high: float, low: float, close: float) -> Optional[float]:
+        if self._undo is None:
+            return self.update(high, low, close)
+        tr = self.tr.replace(high, low, close)
+        self.value, n_seed = self._undo
+        del self._seed[n_seed:]
+        self._update_tr(tr)
+        return self.value
+
+    def update_kline(self, k: List) -> Optional[float]:
+        return self.update(float(k[2]), float(k[3]), float(k[4]))
+
+    def replace_kline(self, k: List) -> Optional[float]:
+        return self.replace(float(k[2]), float(k[3]), float(k[4]))
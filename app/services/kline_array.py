@@ -0,0 +1,99 @@
+from typing import Any, List, Sequence
+
+import numpy as np
+
+Kline = List[Any]
+
+# Column order of the OHLCV block, matching REST kline row indices 1..5
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
+# Fixed 56-byte on-disk record, see kline_cache
+RECORD_DTYPE = np.dtype([
+    ("open_time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"),
+    ("close", "<f8"), ("volume", "<f8"), ("close_time", "<i8"),
+])
+
+
+class KlineArray:
+    """
+    Columnar klines: int64 open/close times and a (5, n) float64 OHLCV block whose rows
+    (open, high, low, close, volume) are each contiguous.
+
+    Built once from decoded REST rows (strings) so consumers never re-parse `float(k[4])`.
+    About 56 bytes per candle versus roughly 0.8 KB for a REST row of 12 Python objects.
+    Slicing returns views.
+    """
+
+    __slots__ = ("open_time", "ohlcv", "close_time")
+
+    def __init__(self, open_time: np.ndarray, ohlcv: np.ndarray, close_time: np.ndarray):
+        self.open_time = open_time
+        self.ohlcv = ohlcv
+        self.close_time = close_time
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Kline]) -> "KlineArray":
+        n = len(rows)
+        if not n:
+            return cls.empty()
+        open_time = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        close_time = np.fromiter((r[6] for r in rows), dtype=np.int64, count=n)
+        ohlcv = np.ascontiguousarray(np.array([r[1:6] for r in rows], dtype=np.float64).T)
+        return cls(open_time, ohlcv, close_time)
+
+    @classmethod
+    def from_records(cls, rec: np.ndarray) -> "KlineArray":
+        ohlcv = np.empty((5, len(rec)), dtype=np.float64)
+        for i, name in enumerate(("open", "high", "low", "close", "volume")):
+            ohlcv[i] = rec[name]
+        return cls(np.array(rec["open_time"], dtype=np.int64), ohlcv, np.array(rec["close_time"], dtype=np.int64))
+
+    @classmethod
+    def empty(cls) -> "KlineArray":
+        return cls(np.empty(0, np.int64), np.empty((5, 0), np.float64), np.empty(0, np.int64))
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    def __getitem__(self, idx) -> "KlineArray":
+        if not isinstance(idx, slice):
+            raise TypeError("KlineArray supports slicing only; use the column arrays for scalars")
+        return KlineArray(self.open_time[idx], self.ohlcv[:, idx], self.close_time[idx])
+
+    @property
+    def open(self) -> np.ndarray:
+        return self.ohlcv[OPEN]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self.ohlcv[HIGH]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self.ohlcv[LOW]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.ohlcv[CLOSE]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.ohlcv[VOLUME]
+
+    @property
+    def nbytes(self) -> int:
+        return self.open_time.nbytes + self.ohlcv.nbytes + self.close_time.nbytes
+
+    def to_records(self) -> np.ndarray:
+        rec = np.empty(len(self), dtype=RECORD_DTYPE)
+        rec["open_time"] = self.open_time
+        for i, name in enumerate(("open", "high", "low", "close", "volume")):
+            rec[name] = self.ohlcv[i]
+        rec["close_time"] = self.close_time
+        return rec
+
+    def to_rows(self) -> List[Kline]:
+        """REST-shaped rows (first 7 fields, floats instead of strings) for list-based strategies."""
+        ot = self.open_time.tolist()
+        ct = self.close_time.tolist()
+        return [[ot[i], *vals, ct[i]] for i, vals in enumerate(self.ohlcv.T.tolist())]
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .binance import interval_ms
+from .kline_array import RECORD_DTYPE, KlineArray
+
+log = logging.getLogger("kline_cache")
+
+Kline = List[Any]
+# fetch(symbol, interval, start_ms, end_ms) -> REST kline rows with open_time in [start_ms, end_ms]
+Fetch = Callable[[str, str, int, int], Awaitable[List[Kline]]]
+
+
+class KlineCache:
+    """
+    On-disk history of closed klines per (symbol, interval).
+
+    Each series is a headerless file of fixed 56-byte little-endian records
+    (`RECORD_DTYPE`) sorted by open time, so it can be memory-mapped and range-read with
+    a binary search on the open-time column without loading the file. A small JSON
+    sidecar remembers the earliest start already requested, so symbols listed after
+    that point are not re-queried for history that does not exist.
+    """
+
+    def __init__(self, root: str | None = None):
+        self.root = Path(root or getattr(settings, "KLINE_CACHE_DIR", "/tmp/klines"))
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def path(self, symbol: str, interval: str) -> Path:
+        return self.root / f"{symbol.upper()}_{interval}.bin"
+
+    def _meta_path(self, symbol: str, interval: str) -> Path:
+        return self.root / f"{symbol.upper()}_{interval}.json"
+
+    def _map(self, symbol: str, interval: str) -> np.ndarray | None:
+        p = self.path(symbol, interval)
+        try:
+            if p.stat().st_size < RECORD_DTYPE.itemsize:
+                return None
+        except FileNotFoundError:
+            return None
+        return np.memmap(p, dtype=RECORD_DTYPE, mode="r")
+
+    def bounds(self, symbol: str, interval: str) -> Tuple[int, int] | None:
+        """(first, last) cached open time."""
+        mm = self._map(symbol, interval)
+        if mm is None:
+            return None
+        return int(mm[0]["open_time"]), int(mm[-1]["open_time"])
+
+    def read(self, symbol: str, interval: str, start_ms: int | None = None, end_ms: int | None = None) -> KlineArray:
+        """Candles with open time in [start_ms, end_ms]; only the touched pages are read."""
+        mm = self._map(symbol, interval)
+        if mm is None:
+            return KlineArray.empty()
+        times = mm["open_time"]
+        lo = 0 if start_ms is None else int(np.searchsorted(times, start_ms, side="left"))
+        hi = len(mm) if end_ms is None else int(np.searchsorted(times, end_ms, side="right"))
+        return KlineArray.from_records(mm[lo:hi])
+
+    def _covered_from(self, symbol: str, interval: str) -> int | None:
+        try:
+            return int(json.loads(self._meta_path(symbol, interval).read_text())["covered_from"])
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+    def _set_covered_from(self, symbol: str, interval: str, start_ms: int) -> None:
+        self._meta_path(symbol, interval).write_text(json.dumps({"covered_from": start_ms}))
+
+    def append(self, symbol: str, interval: str, arr: KlineArray) -> int:
+        """Append candles newer than the cached tail. Returns the number of records written."""
+        b = self.bounds(symbol, interval)
+        if b is not None:
+            arr = arr[int(np.searchsorted(arr.open_time, b[1], side="right")):]
+        if not len(arr):
+            return 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.path(symbol, interval), "ab") as f:
+            f.write(arr.to_records().tobytes())
+        return len(arr)
+
+    def prepend(self, symbol: str, interval: str, arr: KlineArray) -> int:
+        """Insert candles older than the cached head (rewrites the file atomically)."""
+        b = self.bounds(symbol, interval)
+        if b is None:
+            return self.append(symbol, interval, arr)
+        arr = arr[:int(np.searchsorted(arr.open_time, b[0], side="left"))]
+        if not len(arr):
+            return 0
+        p = self.path(symbol, interval)
+        tmp = p.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(arr.to_records().tobytes())
+            with open(p, "rb") as src:
+                while chunk := src.read(1 << 20):
+                    f.write(chunk)
+        os.replace(tmp, p)
+        return len(arr)
+
+    async def load(self, symbol: str, interval: str, start_ms: int, end_ms: int, fetch: Fetch) -> KlineArray:
+        """
+        Candles in [start_ms, end_ms], downloading only what the cache is missing.
+
+        Only closed candles are persisted; the in-progress one is fetched but not stored.
+        """
+        key = (symbol.upper(), interval)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        step = interval_ms(interval)
+        now = int(time.time() * 1000)
+        async with lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            b = self.bounds(symbol, interval)
+            covered = self._covered_from(symbol, interval)
+            if b is None:
+                rows = await fetch(symbol, interval, start_ms, end_ms)
+                self.append(symbol, interval, _closed(rows, now))
+                self._set_covered_from(symbol, interval, start_ms)
+                log.info("kline_cache_fill", extra={"symbol": symbol, "interval": interval, "rows": len(rows)})
+                tail: List[Kline] = [r for r in rows if int(r[6]) >= now]
+            else:
+                first, last = b
+                if start_ms < first and (covered is None or start_ms < covered):
+                    head = await fetch(symbol, interval, start_ms, first - 1)
+                    n = self.prepend(symbol, interval, _closed(head, now))
+                    self._set_covered_from(symbol, interval, start_ms)
+                    log.info("kline_cache_head", extra={"symbol": symbol, "interval": interval, "rows": n})
+                tail = []
+                if end_ms >= last + step:
+                    rows = await fetch(symbol, interval, last + step, end_ms)
+                    n = self.append(symbol, interval, _closed(rows, now))
+                    tail = [r for r in rows if int(r[6]) >= now]
+                    log.info("kline_cache_tail", extra={"symbol": symbol, "interval": interval, "rows": n})
+        arr = self.read(symbol, interval, start_ms, end_ms)
+        if tail:
+            # Still-forming candle: returned to the caller, never cached
+            extra = KlineArray.from_rows([r for r in tail if start_ms <= int(r[0]) <= end_ms])
+            if len(extra):
+                arr = _concat(arr, extra)
+        return arr
+
+
+def _closed(rows: List[Kline], now_ms: int) -> KlineArray:
+    return KlineArray.from_rows([r for r in rows if int(r[6]) < now_ms])
+
+
+def _concat(a: KlineArray, b: KlineArray) -> KlineArray:
+    return KlineArray(np.concatenate([a.open_time, b.open_time]),
+                      np.concatenate([a.ohlcv, b.ohlcv], axis=1),
+                      np.concatenate([a.close_time, b.close_time]))
+
+
+kline_cache = KlineCache()
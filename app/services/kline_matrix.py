@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .kline_array import CLOSE, HIGH, LOW
+
+Kline = List[Any]
+
+
+class KlineMatrix:
+    """
+    Symbols × time view of equally long kline windows: row i is `symbols[i]`, column j
+    its j-th candle (windows are right-aligned, so column -1 is every symbol's last bar).
+
+    The windows stay REST-shaped rows; a column is parsed into numpy on first access
+    and cached. `tail(k)` exposes only the last k columns, so a strategy that
+    streams state reads a few candles per symbol instead of whole windows, and
+    `take(rows)` narrows to the symbols that need more.
+    """
+
+    __slots__ = ("symbols", "windows", "_depth", "_cols")
+
+    def __init__(self, symbols: Sequence[str], windows: Sequence[List[Kline]], depth: int | None = None):
+        n = len(windows[0]) if windows else 0
+        self.symbols: Tuple[str, ...] = tuple(symbols)
+        self.windows: List[List[Kline]] = list(windows)
+        self._depth = n if depth is None else min(depth, n)  # columns exposed, counted from the right
+        self._cols: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_rows(cls, symbols: Sequence[str], windows: Sequence[List[Kline]]) -> "KlineMatrix":
+        n = len(windows[0]) if windows else 0
+        if any(len(w) != n for w in windows):
+            raise ValueError("KlineMatrix needs windows of equal length")
+        return cls(symbols, windows)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.windows), self._depth
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def tail(self, k: int) -> "KlineMatrix":
+        """The last `k` columns; nothing is parsed until a column is read."""
+        return KlineMatrix(self.symbols, self.windows, min(k, self._depth))
+
+    def take(self, rows) -> "KlineMatrix":
+        """The given rows (indices or a boolean mask), in order."""
+        idx = np.flatnonzero(rows) if np.asarray(rows).dtype == bool else rows
+        return KlineMatrix([self.symbols[i] for i in idx], [self.windows[i] for i in idx], self._depth)
+
+    def _column(self, name: str, field: int, dtype) -> np.ndarray:
+        col = self._cols.get(name)
+        if col is None:
+            n, t = self.shape
+            # One flat list per field: the cheapest way from REST strings to a numpy block
+            flat = [k[field] for w in self.windows for k in w[-t:]] if t else []
+            col = self._cols[name] = np.array(flat, dtype=dtype).reshape(n, t)
+        return col
+
+    @property
+    def open_time(self) -> np.ndarray:
+        return self._column("open_time", 0, np.int64)
+
+    @property
+    def close_time(self) -> np.ndarray:
+        return self._column("close_time", 6, np.int64)
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._column("high", HIGH + 1, np.float64)
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._column("low", LOW + 1, np.float64)
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._column("close", CLOSE + 1, np.float64)
@@ -0,0 +1,128 @@
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Tuple
+
+from ..config import settings
+from .binance import BinanceClient, interval_ms
+from .kline_array import KlineArray
+
+log = logging.getLogger("kline_store")
+
+Kline = List[Any]
+SeriesKey = Tuple[str, str]  # (symbol, interval)
+
+
+def merge_rows(window: Deque[Kline], rows: Iterable[Kline]) -> None:
+    """Merge kline rows into an open-time ordered window, replacing bars with the same open time."""
+    for row in rows:
+        t = row[0]
+        if not window or t > window[-1][0]:
+            window.append(row)
+            continue
+        # Walk back from the tail; updates almost always hit the last bar
+        for i in range(len(window) - 1, -1, -1):
+            if window[i][0] == t:
+                window[i] = row
+                break
+            if window[i][0] < t:
+                break
+
+
+class KlineSeries:
+    """Ring buffer of the most recent klines for one (symbol, interval)."""
+
+    def __init__(self, symbol: str, interval: str, maxlen: int):
+        self.symbol = symbol
+        self.interval = interval
+        self.rows: Deque[Kline] = deque(maxlen=maxlen)
+        self.version = 0
+        self._window: List[Kline] | None = None
+        self._memo: Dict[Hashable, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def maxlen(self) -> int:
+        return self.rows.maxlen
+
+    @property
+    def last_open_ms(self) -> int | None:
+        return self.rows[-1][0] if self.rows else None
+
+    def merge(self, rows: Iterable[Kline]) -> None:
+        merge_rows(self.rows, rows)
+        self.version += 1
+        self._window = None
+        self._memo.clear()
+
+    def clear(self) -> None:
+        self.rows.clear()
+        self.version += 1
+        self._window = None
+        self._memo.clear()
+
+    def window(self) -> List[Kline]:
+        """List view of the buffer, shared by every reader until the next merge. Do not mutate."""
+        if self._window is None:
+            self._window = list(self.rows)
+        return self._window
+
+    def array(self) -> KlineArray:
+        """Columnar copy of the buffer, parsed once per version."""
+        return self.memo("array", lambda: KlineArray.from_rows(self.rows))
+
+    def memo(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Cache a value derived from the current contents; dropped on the next merge."""
+        try:
+            return self._memo[key]
+        except KeyError:
+            val = self._memo[key] = fn()
+            return val
+
+
+class KlineStore:
+    """
+    Shared per-(symbol, interval) kline windows read by every strategy on that timeframe.
+
+    The first refresh of a series downloads the full window; later refreshes fetch only the
+    candles since the last stored bar (normally the in-progress bar plus at most one new one)
+    and append or replace the tail.
+    """
+
+    def __init__(self, maxlen: int | None = None):
+        self.maxlen = maxlen or getattr(settings, "KLINE_WINDOW", 300)
+        self._series: Dict[SeriesKey, KlineSeries] = {}
+
+    def series(self, symbol: str, interval: str) -> KlineSeries:
+        key = (symbol, interval)
+        s = self._series.get(key)
+        if s is None:
+            s = self._series[key] = KlineSeries(symbol, interval, self.maxlen)
+        return s
+
+    def window(self, symbol: str, interval: str) -> List[Kline]:
+        return self.series(symbol, interval).window()
+
+    def keys(self) -> List[SeriesKey]:
+        return list(self._series)
+
+    def fetch_limit(self, series: KlineSeries, now_ms: int) -> int:
+        """Number of newest candles needed to bring the series up to `now_ms`."""
+        last = series.last_open_ms
+        if last is None:
+            return self.maxlen
+        missed = (now_ms - last) // interval_ms(series.interval) + 1
+        if missed >= self.maxlen:
+            return self.maxlen
+        return int(max(2, missed))
+
+    async def refresh(self, binance: BinanceClient, symbol: str, interval: str) -> KlineSeries:
+        s = self.series(symbol, interval)
+        limit = self.fetch_limit(s, binance._timestamp())
+        rows = await binance.klines(symbol, interval, limit=limit)
+        if limit >= self.maxlen:
+            # Warm-up or a gap longer than the window: start over
+            s.clear()
+        s.merge(rows)
+        return s
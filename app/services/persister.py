@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+from ..config import settings
+from .. import metrics
+from .redis_queue import RedisClient
+from .supabase import SupabaseClient, SupabaseError
+
+log = logging.getLogger("persister")
+
+Row = Dict[str, Any]
+
+DEAD_LETTER_KEY = "signals:dead"
+
+# _insert outcomes
+_OK, _FAILED, _REJECTED = "ok", "failed", "rejected"
+
+
+class SignalPersister:
+    """
+    Write-behind signal persistence.
+
+    `submit` only appends to an in-memory buffer, so the scan loop never waits on
+    Supabase. A background task flushes the buffer as one bulk insert when it reaches
+    PERSIST_BATCH_SIZE rows or every PERSIST_FLUSH_SEC, retrying with exponential
+    backoff. Rows that still fail are spilled to the Redis `signals:outgoing` list and
+    replayed once inserts succeed again (probed every PERSIST_PROBE_SEC while down).
+
+    A batch PostgREST rejects with a 4xx (other than 408/429) is not retried: its rows
+    are inserted one by one and those rejected again go to the `signals:dead` list
+    (counted in `dead` and signal_persist_dead_letters_total), so a bad row neither
+    blocks the rows around it nor circulates through the replay list.
+    """
+
+    def __init__(self, supa: SupabaseClient, redis: RedisClient,
+                 batch_size: int | None = None, flush_sec: float | None = None):
+        self.supa = supa
+        self.redis = redis
+        self.batch_size = max(1, batch_size or getattr(settings, "PERSIST_BATCH_SIZE", 50))
+        self.flush_sec = flush_sec or getattr(settings, "PERSIST_FLUSH_SEC", 1.0)
+        self.retry_max = max(1, getattr(settings, "PERSIST_RETRY_MAX", 3))
+        self._buf: List[Row] = []
+        self._full = asyncio.Event()
+        self.inserted = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.failed = 0
+        self.dead = 0
+        self.last_flush_ms = 0
+        self.healthy = True
+        self._probe_at = 0.0
+
+    def submit(self, row: Row) -> None:
+        self._buf.append(row)
+        if len(self._buf) >= self.batch_size:
+            self._full.set()
+
+    @property
+    def depth(self) -> int:
+        return len(self._buf)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"buffered": len(self._buf), "inserted": self.inserted, "spilled": self.spilled,
+                "replayed": self.replayed, "failed": self.failed, "dead": self.dead, "last_flush_ms": self.last_flush_ms,
+                "healthy": self.healthy}
+
+    async def run(self, stop_event: asyncio.Event):
+        while not stop_event.is_set():
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_sec)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+                if self.healthy or time.monotonic() >= self._probe_at:
+                    await self.replay()
+            except Exception:
+                log.exception("persist_loop_error")
+        # Drain what is left on shutdown
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Insert everything buffered, spilling batches that keep failing."""
+        while self._buf:
+            rows, self._buf = self._buf[:self.batch_size], self._buf[self.batch_size:]
+            if not self._buf:
+                self._full.clear()
+            outcome = await self._insert(rows, self.retry_max)
+            if outcome == _OK:
+                self.inserted += len(rows)
+            elif outcome == _REJECTED:
+                self.inserted += await self._isolate(rows)
+            else:
+                await self._spill(rows)
+                self.spilled += len(rows)
+
+    async def _insert(self, rows: List[Row], attempts: int) -> str:
+        delay = getattr(settings, "PERSIST_RETRY_BASE_DELAY", 0.5)
+        for attempt in range(1, attempts + 1):
+            t0 = time.perf_counter()
+            try:
+                await self.supa.insert_signals(rows)
+                elapsed = time.perf_counter() - t0
+                metrics.SUPABASE_INSERT_SECONDS.observe(elapsed)
+                self.last_flush_ms = int(elapsed * 1000)
+                self.healthy = True
+                return _OK
+            except Exception as e:
+                metrics.ERRORS.labels("supabase_insert").inc()
+                log.warning("persist_insert_error", extra={"rows": len(rows), "attempt": attempt, "error": str(e)})
+                if isinstance(e, SupabaseError) and not e.retryable:
+                    # Supabase is up and answered; the rows are the problem
+                    self.healthy = True
+                    return _REJECTED
+                if attempt < attempts:
+                    await asyncio.sleep(delay * 2 ** (attempt - 1))
+        self.healthy = False
+        self._probe_at = time.monotonic() + getattr(settings, "PERSIST_PROBE_SEC", 10.0)
+        return _FAILED
+
+    async def _isolate(self, rows: List[Row]) -> int:
+        """Insert a rejected batch row by row; returns how many went in. Rejected rows are dead-lettered."""
+        inserted = 0
+        retry: List[Row] = []
+        for row in rows:
+            outcome = await self._insert([row], 1)
+            if outcome == _OK:
+                inserted += 1
+            elif outcome == _REJECTED:
+                await self._dead_letter(row)
+            else:
+                retry.append(row)
+        if retry:
+            await self._spill(retry)
+            self.spilled += len(retry)
+        return inserted
+
+    async def _dead_letter(self, row: Row) -> None:
+        self.dead += 1
+        metrics.PERSIST_DEAD_LETTERS.inc()
+        log.error("persist_row_rejected", extra={"row": row})
+        if not await self.redis.queue_signal(row, DEAD_LETTER_KEY):
+            self.failed += 1
+
+    async def _spill(self, rows: List[Row]) -> None:
+        lost = 0
+        for row in rows:
+            if not await self.redis.queue_signal(row):
+                lost += 1
+                log.error("persist_row_lost", extra={"row": row})
+        self.failed += lost
+        log.warning("persist_spilled", extra={"rows": len(rows) - lost})
+
+    async def replay(self) -> None:
+        """Move spilled rows back into Supabase, one batch per call."""
+        rows: List[Row] = []
+        while len(rows) < self.batch_size:
+            row = await self.redis.pop_signal()
+            if row is None:
+                break
+            rows.append(row)
+        if not rows:
+            return
+        # While Supabase is down this is a single-attempt probe
+        outcome = await self._insert(rows, self.retry_max if self.healthy else 1)
+        if outcome == _OK:
+            self.replayed += len(rows)
+            log.info("persist_replayed", extra={"rows": len(rows)})
+        elif outcome == _REJECTED:
+            self.replayed += await self._isolate(rows)
+        else:
+            await self._spill(rows)
@@ -0,0 +1,78 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict
+
+_lock = asyncio.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+async def cprofile(seconds: float, limit: int = 40, sort: str = "cumulative") -> str:
+    """
+    Deterministic profile of the event loop thread (worker, API and bot) for `seconds`.
+
+    The profiler hooks the calling thread, so everything the loop runs while this
+    coroutine sleeps is captured. Returns pstats text for the top `limit` entries.
+    """
+    async with _lock:
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            prof.disable()
+    out = io.StringIO()
+    pstats.Stats(prof, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+async def sample(seconds: float, interval: float = 0.005, limit: int = 40) -> Dict[str, Any]:
+    """
+    Statistical profile: a helper thread snapshots the loop thread's stack every
+    `interval` seconds. Much lower overhead than cProfile; returns the hottest
+    collapsed stacks (root;...;leaf) and leaf frames with their sample counts.
+    """
+    target = threading.get_ident()
+    stacks: Counter = Counter()
+    leaves: Counter = Counter()
+    done = threading.Event()
+    taken = [0]
+
+    def sampler():
+        while not done.wait(interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            taken[0] += 1
+            names = []
+            while frame is not None:
+                names.append(_frame_label(frame))
+                frame = frame.f_back
+            leaves[names[0]] += 1
+            stacks[";".join(reversed(names))] += 1
+
+    async with _lock:
+        t = threading.Thread(target=sampler, name="profile-sampler", daemon=True)
+        started = time.monotonic()
+        t.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            done.set()
+            await asyncio.to_thread(t.join)
+    return {
+        "seconds": round(time.monotonic() - started, 3),
+        "samples": taken[0],
+        "top_leaves": leaves.most_common(limit),
+        "top_stacks": stacks.most_common(limit),
+    }
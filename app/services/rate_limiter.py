@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Mapping
+
+from ..config import settings
+
+log = logging.getLogger("rate_limiter")
+
+
+class TokenBucket:
+    """Async token bucket: `capacity` tokens, refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self._ts = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait until `tokens` are available and take them. Returns the time spent waiting (seconds)."""
+        waited = 0.0
+        async with self._lock:  # FIFO: later callers queue behind a large request
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (min(tokens, self.capacity) - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+def klines_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def request_weight(path: str, params: Mapping[str, Any] | None = None) -> int:
+    """Request weight of a USD-M futures REST call, per the Binance endpoint docs."""
+    params = params or {}
+    if path.endswith("/klines"):
+        return klines_weight(int(params.get("limit", 500)))
+    if path.endswith("/ticker/price"):
+        return 1 if "symbol" in params else 2
+    if path.endswith("/ticker/24hr"):
+        return 1 if "symbol" in params else 40
+    return 1
+
+
+class BinanceWeightLimiter:
+    """
+    Client-side view of the per-IP request-weight budget (`X-MBX-USED-WEIGHT-1m`).
+
+    Requests take their weight from a token bucket sized to a safety fraction of the
+    exchange limit, so bursts are throttled locally before Binance answers 429/418.
+    Each response's used-weight header pulls the local estimate back in line with the
+    server's count; weight spent by other processes on the same IP is accounted for that way.
+    """
+
+    def __init__(self, limit_per_min: int | None = None, safety: float | None = None):
+        self.limit = int(limit_per_min or getattr(settings, "BINANCE_WEIGHT_LIMIT", 2400))
+        self.safety = float(safety or getattr(settings, "BINANCE_WEIGHT_SAFETY", 0.8))
+        self.budget = self.limit * self.safety
+        self.bucket = TokenBucket(rate=self.budget / 60.0, capacity=self.budget)
+        self.server_used = 0
+        self.server_used_at = 0.0
+        self.blocked_until = 0.0
+        self.spent: Dict[str, int] = {}
+        self.waited_s = 0.0
+        self.throttled = 0
+
+    async def acquire(self, path: str, params: Mapping[str, Any] | None = None) -> int:
+        weight = request_weight(path, params)
+        pause = self.blocked_until - time.monotonic()
+        if pause > 0:
+            self.throttled += 1
+            await asyncio.sleep(pause)
+        waited = await self.bucket.acquire(weight)
+        if waited:
+            self.throttled += 1
+            self.waited_s += waited
+        self.spent[path] = self.spent.get(path, 0) + weight
+        return weight
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        used = headers.get("X-MBX-USED-WEIGHT-1m") or headers.get("x-mbx-used-weight-1m")
+        if used is None:
+            return
+        try:
+            used = int(used)
+        except ValueError:
+            return
+        self.server_used = used
+        self.server_used_at = time.time()
+        # Trust the server when it has counted more than we think we spent
+        headroom = self.budget - used
+        if self.bucket.available() > headroom:
+            self.bucket.tokens = headroom
+        if used >= self.limit * 0.95:
+            self.pause_until_next_minute()
+
+    def pause_until_next_minute(self) -> None:
+        # The exchange counter resets on wall-clock minute boundaries
+        wait = 60.0 - (time.time() % 60.0)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+        log.warning("binance_weight_pause", extra={"used": self.server_used, "limit": self.limit, "pause_s": round(wait, 2)})
+
+    def penalize(self, retry_after_s: float | None) -> None:
+        """Stop issuing requests after a 429/418, for Retry-After seconds if given."""
+        if retry_after_s:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + float(retry_after_s))
+        else:
+            self.pause_until_next_minute()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit_per_min": self.limit,
+            "budget_per_min": self.budget,
+            "tokens_available": round(self.bucket.available(), 2),
+            "server_used_1m": self.server_used,
+            "server_used_age_s": round(time.time() - self.server_used_at, 2) if self.server_used_at else None,
+            "headroom_1m": self.limit - self.server_used,
+            "blocked_for_s": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+            "throttled": self.throttled,
+            "waited_s": round(self.waited_s, 3),
+            "spent_by_endpoint": dict(self.spent),
+        }
+
+
+# One budget per process: every Binance caller shares the same IP weight limit
+binance_limiter = BinanceWeightLimiter()
@@ -1,9 +1,13 @@
+import json
 import logging
 import redis.asyncio as redis
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 from ..config import settings
 log = logging.getLogger("redis")
 
+def dedup_fails_open() -> bool:
+    return (getattr(settings, "DEDUP_FAIL_MODE", "closed") or "closed").lower() == "open"
+
 class RedisClient:
     def __init__(self):
         log.info('redis_init_start')
@@ -17,6 +21,13 @@ class RedisClient:
                 kwargs["ssl_cert_reqs"] = None
         self._kwargs = kwargs
         self.r = redis.from_url(self.url, **kwargs)
+        self._binary = None
+
+    def binary(self):
+        """Client on the same connection settings that returns raw bytes (for binary values)."""
+        if self._binary is None:
+            self._binary = redis.from_url(self.url, **{**self._kwargs, "decode_responses": False})
+        return self._binary
 
     async def ping(self):
         try:
@@ -30,14 +41,16 @@ class RedisClient:
                 return await self.r.ping()
             raise
 
+    async def set_nx_many(self, keys: List[str], ttl: int) -> List[bool]:
+        """SET NX EX for every key in one pipelined round trip. Raises on Redis errors."""
+        async with self.r.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(key, "1", ex=ttl, nx=True)
+            res = await pipe.execute()
+        return [bool(x) for x in res]
+
     async def dedup_try_set(self, key: str, ttl: int) -> bool:
-        try:
-            res = await self.r.set(key, "1", ex=ttl, nx=True)
-            return bool(res)
-        except Exception as e:
-            # Fail-open on Redis errors so signals still flow
-            log.error('redis_dedup_error', extra={'err': str(e)})
-            return True
+        return await self.try_set(key, ttl)
 
     async def cache_set(self, key: str, value: str, ttl: int = 300):
         try:
@@ -45,22 +58,37 @@ class RedisClient:
         except Exception:
             pass
 
-    async def queue_signal(self, payload: dict):
+    async def queue_signal(self, payload: dict, key: str = "signals:outgoing") -> bool:
         try:
-            await self.r.lpush("signals:outgoing", str(payload))
-        except Exception:
-            pass
+            await self.r.lpush(key, json.dumps(payload))
+            return True
+        except Exception as e:
+            log.error('redis_queue_error', extra={'err': str(e)})
+            return False
 
     async def pop_signal(self):
         try:
-            return await self.r.rpop("signals:outgoing")
+            raw = await self.r.rpop("signals:outgoing")
         except Exception:
             return None
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            log.error('redis_queue_bad_payload', extra={'sample': raw[:200]})
+            return None
 
-    async def try_set(self, key: str, ttl: int = 3600) -> bool:
+    async def try_set(self, key: str, ttl: int = 3600, fail_open: Optional[bool] = None) -> bool:
+        """
+        Claim `key` for `ttl` seconds; True if it was not set yet. On Redis errors the
+        answer is `fail_open` (default from DEDUP_FAIL_MODE: "open" lets signals through,
+        "closed" suppresses them).
+        """
         try:
-            if await self.r.set(name=key, value="1", ex=ttl, nx=True):
-                return True
-            return False
-        except Exception:
-            return False
+            return (await self.set_nx_many([key], ttl))[0]
+        except Exception as e:
+            if fail_open is None:
+                fail_open = dedup_fails_open()
+            log.error('redis_dedup_error', extra={'err': str(e), 'fail_open': fail_open})
+            return fail_open
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from ..config import settings
+from .binance import BinanceClient, interval_ms
+
+log = logging.getLogger("scheduler")
+
+# Weekly candles open on Monday 00:00 UTC; the epoch was a Thursday
+_WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+def candle_boundary(now_ms: int, interval: str) -> int:
+    """Open time of the candle in progress at `now_ms` (= close time + 1 of the last closed one)."""
+    step = interval_ms(interval)
+    offset = _WEEK_OFFSET_MS if interval.endswith("w") else 0
+    return (now_ms - offset) // step * step + offset
+
+
+class CandleScheduler:
+    """
+    Wakes the worker just after exchange candle closes instead of on a fixed poll.
+
+    Times are exchange time (local clock corrected by `BinanceClient.sync_time`,
+    re-synced every TIME_SYNC_SEC). `wait_next` returns the timeframes whose candle
+    has just closed; `advance` tells whether a (symbol, strategy) pair has a newer
+    closed candle than the last one it was evaluated on.
+    """
+
+    def __init__(self, binance: BinanceClient, timeframes: Iterable[str], grace_ms: int | None = None):
+        self.binance = binance
+        self.timeframes = list(dict.fromkeys(timeframes))
+        self.grace_ms = int(grace_ms if grace_ms is not None else getattr(settings, "CANDLE_CLOSE_GRACE_MS", 1500))
+        self._boundary: Dict[str, int] = {}
+        self._evaluated: Dict[Tuple[str, str], int] = {}
+        self._synced_at = 0.0
+
+    def now_ms(self) -> int:
+        return self.binance._timestamp()
+
+    async def _maybe_sync(self) -> None:
+        if time.monotonic() - self._synced_at < getattr(settings, "TIME_SYNC_SEC", 600):
+            return
+        try:
+            await self.binance.sync_time()
+            self._synced_at = time.monotonic()
+        except Exception as e:
+            log.warning("scheduler_time_sync_error", extra={"error": str(e)})
+
+    def due(self, now_ms: int) -> List[str]:
+        """Timeframes whose boundary moved since the previous call (all of them on the first call)."""
+        out = []
+        for tf in self.timeframes:
+            b = candle_boundary(now_ms, tf)
+            if self._boundary.get(tf) != b:
+                self._boundary[tf] = b
+                out.append(tf)
+        return out
+
+    def boundary(self, tf: str) -> int:
+        return self._boundary[tf]
+
+    def next_wake_ms(self, now_ms: int) -> int:
+        return min(candle_boundary(now_ms, tf) + interval_ms(tf) for tf in self.timeframes) + self.grace_ms
+
+    async def wait_next(self, stop_event: asyncio.Event) -> List[str]:
+        await self._maybe_sync()
+        while not stop_event.is_set():
+            now = self.now_ms()
+            # Closes within the grace period are not due yet
+            due = self.due(now - self.grace_ms)
+            if due:
+                return due
+            delay = (self.next_wake_ms(now) - now) / 1000
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=max(0.05, delay))
+            except asyncio.TimeoutError:
+                pass
+        return []
+
+    def advance(self, symbol: str, strategy: str, close_time_ms: int) -> bool:
+        key = (symbol, strategy)
+        if close_time_ms <= self._evaluated.get(key, -1):
+            return False
+        self._evaluated[key] = close_time_ms
+        return True
@@ -0,0 +1,108 @@
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+
+from dateutil import tz
+
+_STEP_MS = 60_000  # DST transitions fall on whole minutes
+
+
+class SessionCalendar:
+    """
+    Local-day boundaries of one timezone as sorted epoch milliseconds.
+
+    Local midnights and UTC-offset changes (DST) are precomputed for a range of days
+    that grows on demand, so mapping a timestamp to its local day, wall-clock time or
+    a session window ("first 4h of the NY day") is a binary search plus integer math
+    instead of a timezone-aware datetime per candle.
+    """
+
+    def __init__(self, tzname: str, days_back: int = 400, days_ahead: int = 30):
+        self.tzname = tzname
+        self.tz = tz.gettz(tzname)
+        self._days: List[date] = []
+        self._starts: List[int] = []  # local midnight of _days[i], epoch ms
+        self._offset_at: List[int] = []  # offset change points, epoch ms
+        self._offsets: List[int] = []  # UTC offset (ms) from _offset_at[i] on
+        self._hours: Dict[Tuple[int, int], int] = {}
+        today = datetime.utcnow().date()
+        self._build(today - timedelta(days=days_back), today + timedelta(days=days_ahead))
+
+    def _midnight_ms(self, d: date) -> int:
+        return int(datetime(d.year, d.month, d.day, tzinfo=self.tz).timestamp() * 1000)
+
+    def _offset_ms(self, ts_ms: int) -> int:
+        dt = datetime.fromtimestamp(ts_ms / 1000, tz=self.tz)
+        return int(dt.utcoffset().total_seconds() * 1000)
+
+    def _build(self, first: date, last: date) -> None:
+        days, starts, at, offsets = [], [], [], []
+        d = first
+        while d <= last + timedelta(days=1):
+            days.append(d)
+            starts.append(self._midnight_ms(d))
+            d += timedelta(days=1)
+        for i, start in enumerate(starts):
+            off = self._offset_ms(start)
+            if not offsets or off != offsets[-1]:
+                at.append(start)
+                offsets.append(off)
+            if i + 1 < len(starts) and self._offset_ms(starts[i + 1]) != off:
+                # Transition inside this day: binary search it to the minute
+                lo, hi = start // _STEP_MS, starts[i + 1] // _STEP_MS
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if self._offset_ms(mid * _STEP_MS) == off:
+                        lo = mid
+                    else:
+                        hi = mid
+                at.append(hi * _STEP_MS)
+                offsets.append(self._offset_ms(hi * _STEP_MS))
+        self._days, self._starts, self._offset_at, self._offsets = days, starts, at, offsets
+        self._hours.clear()
+
+    def _ensure(self, ts_ms: int) -> None:
+        if self._starts[0] <= ts_ms < self._starts[-1]:
+            return
+        d = datetime.utcfromtimestamp(ts_ms / 1000).date()
+        self._build(min(self._days[0], d - timedelta(days=2)), max(self._days[-2], d + timedelta(days=30)))
+
+    def day_index(self, ts_ms: int) -> int:
+        self._ensure(ts_ms)
+        return bisect_right(self._starts, ts_ms) - 1
+
+    def day_of(self, ts_ms: int) -> date:
+        return self._days[self.day_index(ts_ms)]
+
+    def day_bounds(self, ts_ms: int) -> Tuple[int, int]:
+        """[start, end) of the local day containing `ts_ms`, epoch ms."""
+        i = self.day_index(ts_ms)
+        return self._starts[i], self._starts[i + 1]
+
+    def hour_ms(self, ts_ms: int, hour: int) -> int:
+        """Epoch ms of local `hour`:00 on the day containing `ts_ms` (wall clock, so DST days are 23h/25h)."""
+        i = self.day_index(ts_ms)
+        key = (i, hour)
+        t = self._hours.get(key)
+        if t is None:
+            d = self._days[i]
+            t = self._hours[key] = int(datetime(d.year, d.month, d.day, hour, tzinfo=self.tz).timestamp() * 1000)
+        return t
+
+    def first_hours(self, ts_ms: int, hours: int) -> Tuple[int, int]:
+        """[local midnight, local `hours`:00) of the day containing `ts_ms`, epoch ms."""
+        return self.day_bounds(ts_ms)[0], self.hour_ms(ts_ms, hours)
+
+    def offset_ms(self, ts_ms: int) -> int:
+        self._ensure(ts_ms)
+        return self._offsets[bisect_right(self._offset_at, ts_ms) - 1]
+
+    def wall_clock(self, ts_ms: int) -> Tuple[date, int, int]:
+        """(local date, hour, minute) of `ts_ms`."""
+        i = self.day_index(ts_ms)
+        minutes = (ts_ms + self.offset_ms(ts_ms)) // _STEP_MS % 1440
+        return self._days[i], minutes // 60, minutes % 60
+
+
+ny_calendar = SessionCalendar("America/New_York")
+kyiv_calendar = SessionCalendar("Europe/Kyiv")
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from ..config import settings
+from .redis_queue import RedisClient
+
+log = logging.getLogger("sharding")
+
+Shard = Tuple[str, str]  # (symbol, interval)
+
+REPLICAS_KEY = "shards:replicas"
+LEASE_PREFIX = "shards:lease:"
+
+# Compare-and-act on a lease so a replica never touches one it lost
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _default_replica_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class ShardCoordinator:
+    """
+    Splits (symbol, timeframe) shards between worker replicas through Redis leases.
+
+    Every SHARD_HEARTBEAT_SEC a replica refreshes its entry in the replica registry,
+    renews the leases it holds (PX SHARD_LEASE_SEC), and moves towards its fair share
+    of ceil(shards / live replicas): surplus leases are released, missing ones are
+    claimed with SET NX. Claim order is rendezvous-hashed per replica so replicas
+    prefer different shards and the split stays stable across rebalances. A dead
+    replica's leases expire and are picked up by the others on their next beat.
+
+    If Redis can't be reached the current shards are kept until their leases would
+    have expired, then dropped, so two replicas never scan the same shard for long.
+    """
+
+    def __init__(self, redis: RedisClient, shards: Iterable[Shard], replica_id: str | None = None,
+                 lease_sec: float | None = None, heartbeat_sec: float | None = None):
+        self.redis = redis
+        self.shards: List[Shard] = list(dict.fromkeys(shards))
+        self.replica_id = replica_id or getattr(settings, "REPLICA_ID", None) or _default_replica_id()
+        self.lease_ms = int(1000 * (lease_sec or getattr(settings, "SHARD_LEASE_SEC", 30.0)))
+        self.heartbeat_sec = heartbeat_sec or getattr(settings, "SHARD_HEARTBEAT_SEC", 10.0)
+        self.owned: Set[Shard] = set()
+        self.replicas = 1
+        self.changed = asyncio.Event()
+        self._valid_until = 0.0  # monotonic; leases are certainly ours until then
+        self._rank = {s: hashlib.sha1(f"{self.replica_id}|{s[0]}|{s[1]}".encode()).hexdigest() for s in self.shards}
+
+    def set_shards(self, shards: Iterable[Shard]) -> None:
+        """Replace the shard list (e.g. the universe changed); leases on dropped shards just expire."""
+        self.shards = list(dict.fromkeys(shards))
+        self._rank = {s: hashlib.sha1(f"{self.replica_id}|{s[0]}|{s[1]}".encode()).hexdigest() for s in self.shards}
+        self._set_owned(self.owned & set(self.shards))
+
+    @staticmethod
+    def _key(shard: Shard) -> str:
+        return f"{LEASE_PREFIX}{shard[0]}:{shard[1]}"
+
+    def owns(self, symbol: str, interval: str) -> bool:
+        return (symbol, interval) in self.owned and time.monotonic() < self._valid_until
+
+    def stats(self) -> Dict[str, Any]:
+        return {"replica_id": self.replica_id, "replicas": self.replicas, "owned": len(self.owned),
+                "shards": len(self.shards)}
+
+    def _set_owned(self, owned: Set[Shard]) -> None:
+        if owned != self.owned:
+            log.info("shards_changed", extra={"replica_id": self.replica_id, "owned": len(owned),
+                                              "gained": len(owned - self.owned), "lost": len(self.owned - owned),
+                                              "replicas": self.replicas})
+            self.owned = owned
+            self.changed.set()
+
+    async def tick(self) -> None:
+        r = self.redis.r
+        started = time.monotonic()
+        now_ms = int(time.time() * 1000)
+        owned = sorted(self.owned, key=self._rank.get)
+
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.zadd(REPLICAS_KEY, {self.replica_id: now_ms + self.lease_ms})
+            pipe.zremrangebyscore(REPLICAS_KEY, "-inf", now_ms)
+            pipe.zcard(REPLICAS_KEY)
+            for shard in owned:
+                pipe.eval(_RENEW, 1, self._key(shard), self.replica_id, self.lease_ms)
+            res = await pipe.execute()
+        self.replicas = max(1, int(res[2]))
+        kept = [s for s, ok in zip(owned, res[3:]) if ok]
+
+        share = math.ceil(len(self.shards) / self.replicas)
+        surplus, kept = kept[share:], kept[:share]
+        claimed: List[Shard] = []
+        async with r.pipeline(transaction=False) as pipe:
+            for shard in surplus:
+                pipe.eval(_RELEASE, 1, self._key(shard), self.replica_id)
+            candidates = []
+            if len(kept) < share:
+                held = set(kept) | set(surplus)
+                candidates = sorted((s for s in self.shards if s not in held), key=self._rank.get)
+                for shard in candidates:
+                    pipe.set(self._key(shard), self.replica_id, px=self.lease_ms, nx=True)
+            res = await pipe.execute()
+        extra: List[Shard] = []
+        for shard, ok in zip(candidates, res[len(surplus):]):
+            if ok:
+                (claimed if len(kept) + len(claimed) < share else extra).append(shard)
+        if extra:
+            # Got more than the share in one go; hand the rest back right away
+            async with r.pipeline(transaction=False) as pipe:
+                for shard in extra:
+                    pipe.eval(_RELEASE, 1, self._key(shard), self.replica_id)
+                await pipe.execute()
+
+        self._valid_until = started + self.lease_ms / 1000
+        self._set_owned(set(kept) | set(claimed))
+
+    async def run(self, stop_event: asyncio.Event):
+        while not stop_event.is_set():
+            try:
+                await self.tick()
+            except Exception as e:
+                log.warning("shard_heartbeat_error", extra={"replica_id": self.replica_id, "error": str(e)})
+                if time.monotonic() >= self._valid_until:
+                    self._set_owned(set())
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=self.heartbeat_sec)
+            except asyncio.TimeoutError:
+                pass
+        await self.release_all()
+
+    async def release_all(self) -> None:
+        """Give every lease back and leave the registry so others rebalance immediately."""
+        owned, self.owned = list(self.owned), set()
+        try:
+            async with self.redis.r.pipeline(transaction=False) as pipe:
+                for shard in owned:
+                    pipe.eval(_RELEASE, 1, self._key(shard), self.replica_id)
+                pipe.zrem(REPLICAS_KEY, self.replica_id)
+                await pipe.execute()
+        except Exception as e:
+            log.warning("shard_release_error", extra={"replica_id": self.replica_id, "error": str(e)})
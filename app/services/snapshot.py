@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .kline_array import RECORD_DTYPE, KlineArray
+from .kline_store import KlineStore
+
+log = logging.getLogger("snapshot")
+
+# Bump when RECORD_DTYPE or the blob layout changes; old snapshots are then ignored
+_FORMAT = b"\x01"
+_KLINES = "snapshot:klines:{}:{}"
+_STRATEGIES = "snapshot:strategies"
+
+
+def encode_rows(rows: Iterable[List[Any]]) -> bytes:
+    """Kline rows -> zlib-compressed 56-byte records (about 5x smaller than JSON rows)."""
+    rows = list(rows)
+    return _FORMAT + zlib.compress(KlineArray.from_rows(rows).to_records().tobytes(), 1) if rows else _FORMAT
+
+
+def decode_rows(blob: bytes) -> List[List[Any]]:
+    if not blob or blob[:1] != _FORMAT or len(blob) == 1:
+        return []
+    rec = np.frombuffer(zlib.decompress(blob[1:]), dtype=RECORD_DTYPE)
+    return KlineArray.from_records(rec).to_rows()
+
+
+class Snapshotter:
+    """
+    Warm start for the worker: the kline store's windows and the state of strategies
+    that have `snapshot_state` are written to Redis every SNAPSHOT_INTERVAL_SEC (only
+    series that changed) and once more when the worker stops. On startup `restore`
+    loads them back, so the first refresh of each series fetches only the candles
+    missed while the process was down instead of the whole window. Keys expire after
+    SNAPSHOT_TTL_SEC. `owns(symbol, interval)` limits saving to this replica's shards.
+    """
+
+    def __init__(self, redis, store: KlineStore, strategies: Iterable[Any],
+                 owns: Callable[[str, str], bool] | None = None):
+        self.r = redis.binary()
+        self.store = store
+        self.strategies = [s for s in strategies if hasattr(s, "snapshot_state")]
+        self.owns = owns
+        self.ttl = int(getattr(settings, "SNAPSHOT_TTL_SEC", 86400))
+        self._saved: Dict[Tuple[str, str], int] = {}
+
+    async def restore(self, keys: Iterable[Tuple[str, str]]) -> int:
+        """Load the stored windows for `keys` into empty series; returns how many were restored."""
+        t0 = time.perf_counter()
+        keys = [k for k in keys if not len(self.store.series(*k))]
+        restored = 0
+        try:
+            async with self.r.pipeline(transaction=False) as pipe:
+                for symbol, interval in keys:
+                    pipe.get(_KLINES.format(symbol, interval))
+                pipe.hgetall(_STRATEGIES)
+                *blobs, states = await pipe.execute()
+        except Exception as e:
+            log.warning("snapshot_restore_error", extra={"error": str(e)})
+            return 0
+        for key, blob in zip(keys, blobs):
+            try:
+                rows = decode_rows(blob)
+            except Exception as e:
+                log.warning("snapshot_decode_error", extra={"symbol": key[0], "interval": key[1], "error": str(e)})
+                continue
+            if rows:
+                series = self.store.series(*key)
+                series.merge(rows)
+                self._saved[key] = series.version
+                restored += 1
+        for strat in self.strategies:
+            raw = states.get(strat.name.encode())
+            if raw:
+                try:
+                    strat.restore_state(json.loads(raw))
+                except Exception as e:
+                    log.warning("snapshot_state_error", extra={"strategy": strat.name, "error": str(e)})
+        log.info("snapshot_restored", extra={"series": restored, "requested": len(keys),
+                                             "strategies": len(self.strategies),
+                                             "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)})
+        return restored
+
+    async def save(self) -> int:
+        """Write the series changed since the last save plus strategy state; returns the series count."""
+        t0 = time.perf_counter()
+        changed = []
+        for key in self.store.keys():
+            series = self.store.series(*key)
+            if not len(series) or self._saved.get(key) == series.version:
+                continue
+            if self.owns is not None and not self.owns(*key):
+                continue
+            changed.append((key, series.version, encode_rows(series.rows)))
+        size = sum(len(blob) for _, _, blob in changed)
+        try:
+            async with self.r.pipeline(transaction=False) as pipe:
+                for (symbol, interval), _, blob in changed:
+                    pipe.set(_KLINES.format(symbol, interval), blob, ex=self.ttl)
+                if self.strategies:
+                    pipe.hset(_STRATEGIES, mapping={s.name: json.dumps(s.snapshot_state()) for s in self.strategies})
+                    pipe.expire(_STRATEGIES, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            log.warning("snapshot_save_error", extra={"error": str(e)})
+            return 0
+        for key, version, _ in changed:
+            self._saved[key] = version
+        log.debug("snapshot_saved", extra={"series": len(changed), "bytes": size,
+                                           "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)})
+        return len(changed)
+
+    async def run(self, stop_event: asyncio.Event):
+        period = float(getattr(settings, "SNAPSHOT_INTERVAL_SEC", 60))
+        while not stop_event.is_set():
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=period)
+            except asyncio.TimeoutError:
+                pass
+            if stop_event.is_set():
+                break
+            await self.save()
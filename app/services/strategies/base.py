@@ -1,6 +1,9 @@
 
 from __future__ import annotations
-from typing import List, Dict, Any, Protocol
+from typing import TYPE_CHECKING, List, Dict, Any, Protocol
+
+if TYPE_CHECKING:
+    from ..kline_matrix import KlineMatrix
 
 Kline = List[Any]
 
@@ -8,3 +11,36 @@ class BaseStrategy(Protocol):
     name: str
     timeframe: str
     def run(self, klines: List[Kline], symbol: str) -> List[Dict[str, Any]]: ...
+
+class BatchStrategy(BaseStrategy, Protocol):
+    """
+    Optional extension for backtests: evaluate every bar in one pass.
+
+    `run_batch(klines, symbol, start)` returns {i: signals} for each i >= start where
+    `run(klines[:i+1], symbol)` would return a non-empty list, without re-scanning prefixes.
+    """
+    def run_batch(self, klines: List[Kline], symbol: str, start: int = 0) -> Dict[int, List[Dict[str, Any]]]: ...
+
+class TickerStrategy(BaseStrategy, Protocol):
+    """
+    Optional extension for price-only strategies: evaluated from the all-symbols
+    ticker snapshot each cycle instead of from kline windows.
+    """
+    def run_ticker(self, price: float, symbol: str) -> List[Dict[str, Any]]: ...
+
+class StatefulStrategy(BaseStrategy, Protocol):
+    """
+    Optional extension for strategies with state that can't be rebuilt from kline
+    windows (e.g. a one-shot flag). The worker snapshots it to Redis and restores
+    it on startup; the value must be JSON-serializable.
+    """
+    def snapshot_state(self) -> Dict[str, Any]: ...
+    def restore_state(self, state: Dict[str, Any]) -> None: ...
+
+class MatrixStrategy(BaseStrategy, Protocol):
+    """
+    Optional extension for cross-sectional evaluation: one vectorized pass over every
+    symbol of a timeframe. `run_matrix(m)` takes a `KlineMatrix` (symbols × time) and
+    returns {symbol: signals} with, per symbol, what `run(window, symbol)` would return.
+    """
+    def run_matrix(self, m: "KlineMatrix") -> Dict[str, List[Dict[str, Any]]]: ...
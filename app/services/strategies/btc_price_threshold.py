@@ -20,25 +20,56 @@ class Strategy:
             return []
         if not klines:
             return []
+        return self._check(float(klines[-1][4]), symbol)
 
-        last_close = float(klines[-1][4])
+    def run_ticker(self, price: float, symbol: str) -> List[Dict[str, Any]]:
+        """Same check straight from the all-symbols ticker; the worker then skips klines for this strategy."""
+        if not settings.TEST_SIGNAL_ENABLED or symbol != "BTCUSDT" or Strategy._emitted_once:
+            return []
+        return self._check(price, symbol)
+
+    def _check(self, last_close: float, symbol: str) -> List[Dict[str, Any]]:
         thr = float(settings.TEST_SIGNAL_PRICE)
 
         if last_close > thr:
             import logging
             logging.getLogger('strategy_test').info('test_emit', extra={'symbol': symbol, 'price': last_close, 'thr': thr})
-            entry = last_close
-            sl = round(entry * 0.98, 2)   # -2%
-            tp = round(entry * 1.02, 2)   # +2%
             Strategy._emitted_once = True
-            return [{
-                "symbol": symbol,
-                "side": "LONG",
-                "reason": f"TEST one-shot: price {last_close} > threshold {thr}",
-                "strategy": self.name,
-                "entry": entry,
-                "sl": sl,
-                "tp": tp,
-                "timeframe": self.timeframe,
-            }]
+            return [self._signal(last_close, thr, symbol)]
         return []
+
+    def run_batch(self, klines: List[List[Any]], symbol: str, start: int = 0) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        First bar from `start` whose close is above the threshold. Unlike `run`, this does
+        not consume the per-deploy one-shot, so a backtest leaves the live test signal armed.
+        """
+        if not settings.TEST_SIGNAL_ENABLED or symbol != "BTCUSDT":
+            return {}
+        thr = float(settings.TEST_SIGNAL_PRICE)
+        for i in range(start, len(klines)):
+            last_close = float(klines[i][4])
+            if last_close > thr:
+                return {i: [self._signal(last_close, thr, symbol)]}
+        return {}
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        return {"emitted_once": Strategy._emitted_once}
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        # Keeps a restart from re-sending the one-shot test signal
+        Strategy._emitted_once = Strategy._emitted_once or bool(state.get("emitted_once"))
+
+    def _signal(self, last_close: float, thr: float, symbol: str) -> Dict[str, Any]:
+        entry = last_close
+        sl = round(entry * 0.98, 2)   # -2%
+        tp = round(entry * 1.02, 2)   # +2%
+        return {
+            "symbol": symbol,
+            "side": "LONG",
+            "reason": f"TEST one-shot: price {last_close} > threshold {thr}",
+            "strategy": self.name,
+            "entry": entry,
+            "sl": sl,
+            "tp": tp,
+            "timeframe": self.timeframe,
+        }
@@ -1,59 +1,166 @@
-from typing import List, Dict, Any
-from dateutil import tz
-from datetime import datetime, timedelta
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+from ..sessions import ny_calendar
+
+
+class _RangeState:
+    """First-4h NY range of one symbol's current day, folded from closed candles."""
+    __slots__ = ("start", "end", "high", "low", "last_open")
+
+    def __init__(self, start: int, end: int):
+        self.start, self.end = start, end
+        self.high = self.low = None
+        self.last_open = -1
+
+    def fold(self, k: List[Any]) -> None:
+        h, l = float(k[2]), float(k[3])
+        self.high = h if self.high is None else max(self.high, h)
+        self.low = l if self.low is None else min(self.low, l)
+
+
+class _RangeMatrixState:
+    """`_RangeState` for a fixed tuple of symbols, one lane per row (NaN = nothing folded yet)."""
+    __slots__ = ("start", "end", "high", "low", "last_open")
+
+    def __init__(self, n: int):
+        self.start = np.full(n, -1, dtype=np.int64)
+        self.end = np.full(n, -1, dtype=np.int64)
+        self.high = np.full(n, np.nan)
+        self.low = np.full(n, np.nan)
+        self.last_open = np.full(n, -1, dtype=np.int64)
+
 
 class Strategy:
     name = "four_hour_reentry_5m"
     timeframe = "5m"
 
-    NY_TZ = tz.gettz("America/New_York")
+    calendar = ny_calendar
 
-    def _ny_date(self, ts_ms: int):
-        dt_utc = datetime.utcfromtimestamp(ts_ms/1000).replace(tzinfo=tz.UTC)
-        return dt_utc.astimezone(self.NY_TZ).date()
+    def __init__(self):
+        self._ranges: Dict[str, _RangeState] = {}
+        self._matrix_ranges: Dict[Tuple[str, ...], _RangeMatrixState] = {}
 
-    def _ny_time(self, ts_ms: int):
-        dt_utc = datetime.utcfromtimestamp(ts_ms/1000).replace(tzinfo=tz.UTC)
-        return dt_utc.astimezone(self.NY_TZ).time()
+    def _first_4h(self, ts_ms: int):
+        return self.calendar.first_hours(ts_ms, 4)
 
-    def _today_first_4h_range(self, klines: List[List[Any]]) -> Dict[str, float] | None:
+    def _today_first_4h_range(self, klines: List[List[Any]], symbol: str | None = None) -> Dict[str, float] | None:
         if not klines:
             return None
-        # Use NY date of the last closed candle as "today"
-        last_close_time = int(klines[-1][6])
-        ny_day = self._ny_date(last_close_time)
-        # Collect 5m candles from 00:00 to 03:59:59 NY on that day
-        highs, lows = [], []
-        for k in klines:
-            close_t = int(k[6])
-            if self._ny_date(close_t) != ny_day:
-                continue
-            ny_t = self._ny_time(close_t)
-            # include candles whose CLOSE time is < 04:00
-            if ny_t.hour < 4:
-                highs.append(float(k[2]))
-                lows.append(float(k[3]))
-        if not highs or not lows:
+        # Use NY date of the last closed candle as "today"; the window is the
+        # 5m candles whose CLOSE time is in [00:00, 04:00) NY on that day
+        last = klines[-1]
+        start, end = self._first_4h(int(last[6]))
+        st = self._ranges.get(symbol) if symbol is not None else None
+        if st is None or st.start != start or int(last[0]) < st.last_open:
+            st = _RangeState(start, end)
+            if symbol is not None:
+                self._ranges[symbol] = st
+        # Fold candles that are final (all but the last, which may still be forming)
+        # and not folded yet; walk back from the tail to the first new one
+        i = len(klines) - 1
+        while i > 0 and int(klines[i - 1][0]) > st.last_open and int(klines[i - 1][6]) >= start:
+            i -= 1
+        for k in klines[i:-1]:
+            if start <= int(k[6]) < end:
+                st.fold(k)
+        if len(klines) > 1:
+            st.last_open = max(st.last_open, int(klines[-2][0]))
+        high, low = st.high, st.low
+        if start <= int(last[6]) < end:
+            h, l = float(last[2]), float(last[3])
+            high = h if high is None else max(high, h)
+            low = l if low is None else min(low, l)
+        if high is None:
             return None
-        return {"high": max(highs), "low": min(lows)}
+        return {"high": high, "low": low}
 
     def run(self, klines: List[List[Any]], symbol: str) -> List[Dict[str, Any]]:
         # Expect Binance 5m klines
         if len(klines) < 50:
             return []
-        rng = self._today_first_4h_range(klines)
+        rng = self._today_first_4h_range(klines, symbol)
         if not rng:
             return []
-
         # Last two fully closed 5m candles
-        prev = klines[-2]
-        curr = klines[-1]
+        return self._signals(klines[-2], klines[-1], rng, symbol)
+
+    def run_batch(self, klines: List[List[Any]], symbol: str, start: int = 0) -> Dict[int, List[Dict[str, Any]]]:
+        out: Dict[int, List[Dict[str, Any]]] = {}
+        day_start = day_end = win_end = -1
+        high = low = None
+        for i, k in enumerate(klines):
+            close_t = int(k[6])
+            if not day_start <= close_t < day_end:
+                # Candles arrive in time order, so a new NY date starts a new range
+                day_start, day_end = self.calendar.day_bounds(close_t)
+                win_end = self.calendar.hour_ms(close_t, 4)
+                high = low = None
+            if close_t < win_end:
+                h, l = float(k[2]), float(k[3])
+                high = h if high is None else max(high, h)
+                low = l if low is None else min(low, l)
+            if i < start or i < 49 or high is None:
+                continue
+            sigs = self._signals(klines[i-1], k, {"high": high, "low": low}, symbol)
+            if sigs:
+                out[i] = sigs
+        return out
+
+    def run_matrix(self, m) -> Dict[str, List[Dict[str, Any]]]:
+        """`run` for every row of a KlineMatrix: the first-4h ranges folded and checked for all symbols at once."""
+        n, t = m.shape
+        if not n or t < 50:
+            return {}
+        st = self._matrix_ranges.pop(m.symbols, None) or _RangeMatrixState(n)
+        self._matrix_ranges[m.symbols] = st
+        while len(self._matrix_ranges) > 8:  # symbol sets that stopped coming
+            del self._matrix_ranges[next(iter(self._matrix_ranges))]
+        tail = m.tail(3)
+        ot, ct = tail.open_time, tail.close_time
+        last_ct = ct[:, -1]
+        # Rows of one timeframe almost always share the last close time: one calendar lookup each
+        bounds = {ts: self._first_4h(ts) for ts in set(last_ct.tolist())}
+        start = np.array([bounds[ts][0] for ts in last_ct.tolist()], dtype=np.int64)
+        end = np.array([bounds[ts][1] for ts in last_ct.tolist()], dtype=np.int64)
+        # Like `_RangeState`: a new day, a step back, or more than one unfolded closed candle starts over
+        reseed = (start != st.start) | (ot[:, -1] < st.last_open) | (st.last_open < ot[:, 0])
+        if reseed.any():
+            full = m.take(reseed)
+            closed_ct = full.close_time[:, :-1]
+            in_win = (closed_ct >= start[reseed, None]) & (closed_ct < end[reseed, None])
+            folded = in_win.any(axis=1)
+            st.high[reseed] = np.where(folded, np.where(in_win, full.high[:, :-1], -np.inf).max(axis=1), np.nan)
+            st.low[reseed] = np.where(folded, np.where(in_win, full.low[:, :-1], np.inf).min(axis=1), np.nan)
+            st.last_open[reseed] = full.open_time[:, -2]
+        fold = ~reseed & (ot[:, -2] > st.last_open) & (ct[:, -2] >= start) & (ct[:, -2] < end)
+        if fold.any():
+            st.high[fold] = np.fmax(st.high[fold], tail.high[fold, -2])
+            st.low[fold] = np.fmin(st.low[fold], tail.low[fold, -2])
+        st.last_open = np.maximum(st.last_open, ot[:, -2])
+        st.start, st.end = start, end
+
+        # The last candle may still be forming: counted, not folded
+        live = (last_ct >= start) & (last_ct < end)
+        high = np.where(live, np.fmax(st.high, tail.high[:, -1]), st.high)
+        low = np.where(live, np.fmin(st.low, tail.low[:, -1]), st.low)
+        prev_close, curr_close = tail.close[:, -2], tail.close[:, -1]
+        with np.errstate(invalid="ignore"):
+            hit = ((prev_close > high) & (curr_close <= high)) | ((prev_close < low) & (curr_close >= low))
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for i in np.flatnonzero(hit):
+            sym = m.symbols[i]
+            out[sym] = self._signals_at(float(prev_close[i]), float(tail.high[i, -2]), float(tail.low[i, -2]),
+                                        float(curr_close[i]), int(last_ct[i]),
+                                        {"high": float(high[i]), "low": float(low[i])}, sym)
+        return out
 
-        prev_close = float(prev[4])
-        curr_close = float(curr[4])
-        prev_high, prev_low = float(prev[2]), float(prev[3])
-        curr_close_time = int(curr[6])
+    def _signals(self, prev: List[Any], curr: List[Any], rng: Dict[str, float], symbol: str) -> List[Dict[str, Any]]:
+        return self._signals_at(float(prev[4]), float(prev[2]), float(prev[3]), float(curr[4]), int(curr[6]), rng, symbol)
 
+    def _signals_at(self, prev_close: float, prev_high: float, prev_low: float, curr_close: float,
+                    curr_close_time: int, rng: Dict[str, float], symbol: str) -> List[Dict[str, Any]]:
         # Breakouts (close outside), then re-entry (current close back inside)
         out: List[Dict[str, Any]] = []
 
@@ -4,6 +4,7 @@ import importlib, pkgutil
 from pathlib import Path
 from typing import Dict
 from .base import BaseStrategy
+from ..binance import interval_ms
 
 PKG = "app.services.strategies"
 
@@ -27,6 +28,7 @@ def load_all() -> Dict[str, BaseStrategy]:
             if strat is None and hasattr(mod, "factory"):
                 strat = mod.factory()
             if strat and hasattr(strat, "name") and hasattr(strat, "timeframe") and hasattr(strat, "run"):
+                interval_ms(strat.timeframe)  # unsupported timeframes (e.g. "1M") fail here, not in the worker
                 res[strat.name] = strat
         except Exception as e:
             print(f"[strategies] failed to import {mod_name}: {e}")
@@ -1,19 +1,144 @@
-from typing import List, Dict, Any
-from ..indicators import close_prices, ema
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+from .. import indicators_np
+from ..indicators import EMA, close_prices, ema
+
+class _EmaState:
+    __slots__ = ("ema50", "ema200", "last_open")
+
+    def __init__(self):
+        self.ema50 = EMA(50)
+        self.ema200 = EMA(200)
+        self.last_open = None
+
+    def update(self, k) -> None:
+        c = float(k[4])
+        self.ema50.update(c)
+        self.ema200.update(c)
+        self.last_open = k[0]
+
+    def replace(self, k) -> None:
+        c = float(k[4])
+        self.ema50.replace(c)
+        self.ema200.replace(c)
+
+class _VecEMA:
+    """`EMA` for many series at once: one lane per row, same update/replace semantics (NaN = not seeded)."""
+    __slots__ = ("k", "period", "value", "prev", "undo")
+
+    def __init__(self, period: int, n: int):
+        self.period = period
+        self.k = 2 / (period + 1)
+        self.value, self.prev, self.undo = (np.full(n, np.nan) for _ in range(3))  # undo: value before the last bar
+
+    def seed(self, rows: np.ndarray, closes: np.ndarray) -> None:
+        """Restart `rows` from their whole windows (closes: len(rows) x T, T >= 2)."""
+        e = indicators_np.ema(closes, self.period)
+        self.value[rows], self.prev[rows] = e[:, -1], e[:, -2]
+        self.undo[rows] = e[:, -2]
+
+    def replace(self, rows: np.ndarray, price: np.ndarray) -> None:
+        self.prev[rows] = self.undo[rows]
+        self.value[rows] = price * self.k + self.undo[rows] * (1 - self.k)
+
+    def update(self, rows: np.ndarray, price: np.ndarray) -> None:
+        self.undo[rows] = self.prev[rows] = self.value[rows]
+        self.value[rows] = price * self.k + self.value[rows] * (1 - self.k)
+
+class _EmaMatrixState:
+    __slots__ = ("ema50", "ema200", "last_open")
+
+    def __init__(self, n: int):
+        self.ema50 = _VecEMA(50, n)
+        self.ema200 = _VecEMA(200, n)
+        self.last_open = np.full(n, -1, dtype=np.int64)
 
 class Strategy:
     name = "trend_pullback_5m"
     timeframe = "5m"
 
+    def __init__(self):
+        # Per-symbol streaming EMAs, advanced by the bars added since the previous call
+        self._state: Dict[str, _EmaState] = {}
+        # The same, vectorized, per symbol set evaluated through `run_matrix`
+        self._matrix_state: Dict[Tuple[str, ...], _EmaMatrixState] = {}
+
+    def _advance(self, klines: List[List[Any]], symbol: str) -> _EmaState:
+        st = self._state.get(symbol)
+        if st is not None and st.last_open == klines[-1][0]:
+            # Same bar again (in-progress candle): revise it
+            st.replace(klines[-1])
+        elif st is not None and st.last_open == klines[-2][0]:
+            # One new bar: settle the previous one, then add it
+            st.replace(klines[-2])
+            st.update(klines[-1])
+        else:
+            # First call for the symbol or a gap: seed from the whole window
+            st = self._state[symbol] = _EmaState()
+            for k in klines:
+                st.update(k)
+        return st
+
     def run(self, klines: List[List[Any]], symbol: str) -> List[Dict[str, Any]]:
+        if len(klines) < 3:
+            return []
+        st = self._advance(klines, symbol)
+        c0, c1 = float(klines[-1][4]), float(klines[-2][4])
+        return self._signals(c0, c1, st.ema50.value, st.ema50.prev, st.ema200.prev, symbol)
+
+    def run_matrix(self, m) -> Dict[str, List[Dict[str, Any]]]:
+        """`run` for every row of a KlineMatrix: streaming EMAs advanced for all symbols at once."""
+        n, t = m.shape
+        if not n or t < 3:
+            return {}
+        st = self._matrix_state.pop(m.symbols, None) or _EmaMatrixState(n)
+        self._matrix_state[m.symbols] = st
+        while len(self._matrix_state) > 8:  # symbol sets that stopped coming
+            del self._matrix_state[next(iter(self._matrix_state))]
+        # Streaming needs only the last two bars; whole windows are read just for rows that reseed
+        tail = m.tail(2)
+        close, ot = tail.close, tail.open_time
+        same = st.last_open == ot[:, -1]
+        one = ~same & (st.last_open == ot[:, -2])
+        reseed = ~(same | one) | np.isnan(st.ema200.value)
+        same &= ~reseed
+        one &= ~reseed
+        full = m.take(reseed).close if reseed.any() else None
+        for e in (st.ema50, st.ema200):
+            if same.any():
+                e.replace(same, close[same, -1])
+            if one.any():
+                e.replace(one, close[one, -2])
+                e.update(one, close[one, -1])
+            if full is not None:
+                e.seed(reseed, full)
+        st.last_open = ot[:, -1].copy()
+
+        c0, c1 = close[:, -1], close[:, -2]
+        v50, p50, p200 = st.ema50.value, st.ema50.prev, st.ema200.prev
+        with np.errstate(invalid="ignore"):
+            hit = ((p50 > p200) & (c1 < p50) & (c0 > v50)) | ((p50 < p200) & (c1 > p50) & (c0 < v50))
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for i in np.flatnonzero(hit):
+            sym = m.symbols[i]
+            out[sym] = self._signals(float(c0[i]), float(c1[i]), float(v50[i]), float(p50[i]), float(p200[i]), sym)
+        return out
+
+    def run_batch(self, klines: List[List[Any]], symbol: str, start: int = 0) -> Dict[int, List[Dict[str, Any]]]:
         closes = close_prices(klines)
         ema50 = ema(closes, 50)
         ema200 = ema(closes, 200)
-        if len(closes) < 3 or len(ema50) < 3 or len(ema200) < 3:
-            return []
-        c0, c1 = closes[-1], closes[-2]
-        e50_0, e50_1 = ema50[-1], ema50[-2]
-        e200_0, e200_1 = ema200[-1], ema200[-2]
+        out: Dict[int, List[Dict[str, Any]]] = {}
+        for i in range(max(start, 2), len(closes)):
+            sigs = self._signals(closes[i], closes[i-1], ema50[i], ema50[i-1], ema200[i-1], symbol)
+            if sigs:
+                out[i] = sigs
+        return out
+
+    @staticmethod
+    def _signals(c0, c1, e50_0, e50_1, e200_1, symbol: str) -> List[Dict[str, Any]]:
         out = []
         # Simple: bullish trend + pullback close above EMA50
         if e50_1 is not None and e200_1 is not None and e50_1 > e200_1 and c1 < e50_1 and c0 > e50_0:
@@ -0,0 +1,120 @@
+import logging
+import zlib
+from typing import Any, Dict, Tuple
+
+from ..config import settings
+
+log = logging.getLogger("strategy_guard")
+
+
+class _Budget:
+    __slots__ = ("calls", "overruns", "streak", "good_streak", "total_s", "max_s", "state", "skip")
+
+    def __init__(self):
+        self.calls = 0
+        self.overruns = 0
+        self.streak = 0  # consecutive calls over budget
+        self.good_streak = 0  # consecutive calls within budget while demoted
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.state = "active"  # active | demoted | disabled
+        self.skip: Dict[str, Tuple[Any, int]] = {}  # symbol -> (last tick, opportunities seen while demoted)
+
+
+class StrategyGuard:
+    """
+    Per-strategy time budgets for `Strategy.run` in the live loop.
+
+    Every call is timed against STRATEGY_BUDGET_MS (or the strategy's entry in
+    STRATEGY_BUDGETS_MS). Overruns are logged; after STRATEGY_OVERRUN_LIMIT in a row
+    STRATEGY_OVERRUN_ACTION applies: "log" only reports, "demote" evaluates the
+    strategy on every STRATEGY_DEMOTE_FACTOR-th candle of each symbol until it stays
+    within budget for as many calls in a row, "disable" stops evaluating it until
+    restart (or `reset`). A call can't be interrupted: it runs on the event loop, so
+    the budget bounds how often a slow strategy gets to stall it.
+    """
+
+    def __init__(self, budget_ms: float | None = None, overrun_limit: int | None = None,
+                 action: str | None = None, demote_factor: int | None = None):
+        self.budget_ms = float(budget_ms or getattr(settings, "STRATEGY_BUDGET_MS", 50.0))
+        self.overrides: Dict[str, float] = dict(getattr(settings, "STRATEGY_BUDGETS_MS", {}) or {})
+        self.overrun_limit = max(1, int(overrun_limit or getattr(settings, "STRATEGY_OVERRUN_LIMIT", 5)))
+        self.action = (action or getattr(settings, "STRATEGY_OVERRUN_ACTION", "log") or "log").lower()
+        self.demote_factor = max(2, int(demote_factor or getattr(settings, "STRATEGY_DEMOTE_FACTOR", 4)))
+        self._budgets: Dict[str, _Budget] = {}
+
+    def _get(self, name: str) -> _Budget:
+        b = self._budgets.get(name)
+        if b is None:
+            b = self._budgets[name] = _Budget()
+        return b
+
+    def budget_s(self, name: str) -> float:
+        return self.overrides.get(name, self.budget_ms) / 1000
+
+    def allow(self, name: str, symbol: str = "", tick: Any = None) -> bool:
+        """
+        Whether the strategy should be evaluated for `symbol` on this opportunity.
+
+        A demoted strategy is throttled per symbol, so every symbol gets its turn
+        regardless of how many there are. `tick` (the candle close time) identifies
+        the opportunity: asking again with the same tick gives the same answer, so a
+        caller can check before committing to a candle and the evaluation re-checks
+        without using up another turn.
+        """
+        b = self._budgets.get(name)
+        if b is None or b.state == "active":
+            return True
+        if b.state == "disabled":
+            return False
+        # Symbols start at different offsets so their turns are spread over the cycles
+        last_tick, seen = b.skip.get(symbol, (None, zlib.crc32(symbol.encode()) % self.demote_factor - 1))
+        if tick is None or tick != last_tick:
+            seen += 1
+            b.skip[symbol] = (tick, seen)
+        return seen % self.demote_factor == 0
+
+    def record(self, name: str, elapsed_s: float, symbol: str = "") -> None:
+        b = self._get(name)
+        b.calls += 1
+        b.total_s += elapsed_s
+        if elapsed_s > b.max_s:
+            b.max_s = elapsed_s
+        budget = self.budget_s(name)
+        if elapsed_s <= budget:
+            b.streak = 0
+            if b.state == "demoted":
+                b.good_streak += 1
+                if b.good_streak >= self.overrun_limit:
+                    b.state, b.good_streak = "active", 0
+                    b.skip.clear()
+                    log.info("strategy_restored", extra={"strategy": name})
+            return
+        b.overruns += 1
+        b.streak += 1
+        b.good_streak = 0
+        log.warning("strategy_overrun", extra={"strategy": name, "symbol": symbol, "elapsed_ms": round(elapsed_s * 1000, 2),
+                                               "budget_ms": budget * 1000, "streak": b.streak})
+        if b.streak < self.overrun_limit or b.state != "active":
+            return
+        if self.action == "disable":
+            b.state = "disabled"
+        elif self.action == "demote":
+            b.state = "demoted"
+        log.error("strategy_over_budget", extra={"strategy": name, "action": self.action, "streak": b.streak,
+                                                 "budget_ms": budget * 1000, "max_ms": round(b.max_s * 1000, 2)})
+
+    def reset(self, name: str | None = None) -> None:
+        for key in ([name] if name else list(self._budgets)):
+            self._budgets.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {"state": b.state, "calls": b.calls, "overruns": b.overruns, "streak": b.streak,
+                   "avg_ms": round(b.total_s * 1000 / b.calls, 3) if b.calls else 0.0,
+                   "max_ms": round(b.max_s * 1000, 3), "budget_ms": self.budget_s(name) * 1000}
+            for name, b in self._budgets.items()
+        }
+
+
+strategy_guard = StrategyGuard()
@@ -1,15 +1,32 @@
 import logging
 import aiohttp
+from typing import Optional
 from ..config import settings
+from . import http
 log = logging.getLogger('supabase')
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+class SupabaseError(RuntimeError):
+    def __init__(self, status: int, body: str = ""):
+        super().__init__(f"supabase_insert_error status={status}")
+        self.status = status
+        self.body = body
+
+    @property
+    def retryable(self) -> bool:
+        """4xx means PostgREST rejected the rows themselves (schema, constraints); only 408/429 are worth retrying."""
+        return not (400 <= self.status < 500) or self.status in (408, 429)
 
 class SupabaseClient:
-    def __init__(self, session: aiohttp.ClientSession):
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         log.info('supabase_init', extra={'url': settings.SUPABASE_URL})
-        self.session = session
+        self.session = session or http.session()
 
     async def insert_signal(self, row: Dict[str, Any]):
+        await self.insert_signals([row])
+
+    async def insert_signals(self, rows: List[Dict[str, Any]]):
+        """Bulk insert: PostgREST takes a JSON array as one multi-row INSERT."""
         url = f"{settings.SUPABASE_URL}/rest/v1/signals"
         headers = {
             "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
@@ -17,9 +34,9 @@ class SupabaseClient:
             "Content-Type": "application/json",
             "Prefer": "return=minimal"
         }
-        log.debug('supabase_insert_request', extra={'url': url, 'bytes': len(str(row))})
-        async with self.session.post(url, headers=headers, json=row, timeout=10) as r:
-            log.info('supabase_insert_response', extra={'status': r.status})
+        log.debug('supabase_insert_request', extra={'url': url, 'rows': len(rows)})
+        async with self.session.post(url, headers=headers, json=rows, timeout=http.timeout(10)) as r:
+            log.info('supabase_insert_response', extra={'status': r.status, 'rows': len(rows)})
             if r.status >= 400:
                 text = await r.text()
-                log.error('supabase_insert_error', extra={'status': r.status, 'body': text[:500]}); raise RuntimeError(f"supabase_insert_error status={r.status}")
+                log.error('supabase_insert_error', extra={'status': r.status, 'body': text[:500]}); raise SupabaseError(r.status, text[:500])
@@ -0,0 +1,78 @@
+from typing import Sequence
+
+import numpy as np
+
+TP, SL, OPEN = 1, -1, 0
+
+
+def _sparse_max(values: np.ndarray) -> np.ndarray:
+    """table[k, i] = max(values[i : i + 2**k]); entries whose block runs past the end are unused."""
+    n = len(values)
+    levels = max(1, int(n).bit_length())
+    table = np.full((levels, n), -np.inf)
+    table[0] = values
+    for k in range(1, levels):
+        half = 1 << (k - 1)
+        width = n - (1 << k) + 1
+        if width <= 0:
+            break
+        np.maximum(table[k - 1, :width], table[k - 1, half:half + width], out=table[k, :width])
+    return table
+
+
+def _first_ge(table: np.ndarray, start: np.ndarray, level: np.ndarray) -> np.ndarray:
+    """
+    For each query, the first index j >= start with values[j] >= level, or n if none.
+
+    Binary lifting over the sparse table: skip the largest power-of-two blocks whose max
+    stays below the level. O(log n) per query, vectorised across all queries.
+    """
+    n = table.shape[1]
+    pos = start.astype(np.int64).copy()
+    for k in range(table.shape[0] - 1, -1, -1):
+        span = 1 << k
+        fits = pos + span <= n
+        idx = np.where(fits, pos, 0)
+        skip = fits & (table[k, idx] < level)
+        pos += np.where(skip, span, 0)
+    return pos
+
+
+class TouchIndex:
+    """
+    First-touch TP/SL resolution over a fixed series of highs and lows.
+
+    Range-max tables over highs and -lows are built once in O(n log n); every
+    signal is then resolved in O(log n), all signals in one vectorised call.
+    """
+
+    def __init__(self, high: np.ndarray, low: np.ndarray):
+        self.n = len(high)
+        self._hi = _sparse_max(np.asarray(high, dtype=np.float64))
+        self._neg_lo = _sparse_max(-np.asarray(low, dtype=np.float64))
+
+    def first_high_at_or_above(self, start, level) -> np.ndarray:
+        return _first_ge(self._hi, np.asarray(start), np.asarray(level, dtype=np.float64))
+
+    def first_low_at_or_below(self, start, level) -> np.ndarray:
+        return _first_ge(self._neg_lo, np.asarray(start), -np.asarray(level, dtype=np.float64))
+
+    def resolve(self, long: Sequence[bool], start: Sequence[int], tp: Sequence[float], sl: Sequence[float]) -> np.ndarray:
+        """
+        Outcome per signal (TP, SL or OPEN) scanning bars from `start` onwards.
+
+        LONG hits TP on high >= tp and SL on low <= sl; SHORT mirrors it. A bar that
+        touches both counts as SL.
+        """
+        long = np.asarray(long, dtype=bool)
+        start = np.asarray(start, dtype=np.int64)
+        tp = np.asarray(tp, dtype=np.float64)
+        sl = np.asarray(sl, dtype=np.float64)
+        if not len(start):
+            return np.zeros(0, dtype=np.int8)
+        tp_at = np.where(long, self.first_high_at_or_above(start, tp), self.first_low_at_or_below(start, tp))
+        sl_at = np.where(long, self.first_low_at_or_below(start, sl), self.first_high_at_or_above(start, sl))
+        out = np.full(len(start), OPEN, dtype=np.int8)
+        out[tp_at < self.n] = TP
+        out[(sl_at < self.n) & (sl_at <= tp_at)] = SL
+        return out
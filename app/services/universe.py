@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from ..config import settings
+from .binance import BinanceClient
+
+log = logging.getLogger("universe")
+
+
+class Universe:
+    """
+    The symbols the worker scans, and the per-cycle all-symbols price snapshot.
+
+    UNIVERSE_MODE "pairs" scans PAIRS; "usdt_perp" loads every trading USDT-margined
+    perpetual from exchangeInfo (refreshed every UNIVERSE_REFRESH_SEC). Either list is
+    then filtered by the all-symbols 24h ticker (refreshed every UNIVERSE_STATS_SEC):
+    UNIVERSE_MIN_QUOTE_VOLUME, UNIVERSE_MIN_RANGE_PCT (24h high-low range as % of last
+    price) and UNIVERSE_MAX_SYMBOLS (top by quote volume). Only symbols that pass get
+    kline fetches; with no filters in pairs mode nothing is requested at all.
+    """
+
+    def __init__(self, binance: BinanceClient):
+        self.binance = binance
+        self.mode = (getattr(settings, "UNIVERSE_MODE", "pairs") or "pairs").lower()
+        self.min_quote_volume = float(getattr(settings, "UNIVERSE_MIN_QUOTE_VOLUME", 0.0) or 0.0)
+        self.min_range_pct = float(getattr(settings, "UNIVERSE_MIN_RANGE_PCT", 0.0) or 0.0)
+        self.max_symbols = int(getattr(settings, "UNIVERSE_MAX_SYMBOLS", 0) or 0)
+        self.listed: List[str] = list(getattr(settings, "PAIRS", ["BTCUSDT"]))
+        self.symbols: List[str] = list(self.listed)
+        self.changed = asyncio.Event()
+        self.on_change: List[Callable[[], None]] = []
+        self._listed_at = 0.0
+        self._stats_at = 0.0
+        self._stats: List[Dict[str, Any]] = []
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.min_quote_volume or self.min_range_pct or self.max_symbols)
+
+    @property
+    def dynamic(self) -> bool:
+        return self.mode == "usdt_perp" or self.filtered
+
+    async def _load_listing(self) -> None:
+        info = await self.binance.exchange_info()
+        self.listed = sorted(
+            s["symbol"] for s in info.get("symbols", [])
+            if s.get("contractType") == "PERPETUAL" and s.get("quoteAsset") == "USDT" and s.get("status") == "TRADING"
+        )
+
+    def _apply_filters(self, stats: List[Dict[str, Any]]) -> List[str]:
+        listed = set(self.listed)
+        ranked: List[Tuple[float, str]] = []
+        for t in stats:
+            sym = t.get("symbol")
+            if sym not in listed:
+                continue
+            qv = float(t.get("quoteVolume") or 0.0)
+            last = float(t.get("lastPrice") or 0.0)
+            rng = (float(t.get("highPrice") or 0.0) - float(t.get("lowPrice") or 0.0)) / last * 100 if last else 0.0
+            if qv < self.min_quote_volume or rng < self.min_range_pct:
+                continue
+            ranked.append((qv, sym))
+        ranked.sort(reverse=True)
+        if self.max_symbols:
+            ranked = ranked[:self.max_symbols]
+        return sorted(sym for _, sym in ranked)
+
+    async def refresh(self) -> None:
+        now = time.monotonic()
+        if self.mode == "usdt_perp" and now - self._listed_at >= getattr(settings, "UNIVERSE_REFRESH_SEC", 3600):
+            await self._load_listing()
+            self._listed_at = now
+        symbols = self.listed
+        if self.filtered:
+            # The 24h stats are cached for ranking only; a new listing is applied right away
+            if now - self._stats_at >= getattr(settings, "UNIVERSE_STATS_SEC", 300):
+                self._stats = await self.binance.ticker_24hr()
+                self._stats_at = now
+            symbols = self._apply_filters(self._stats)
+        if symbols != self.symbols:
+            log.info("universe_changed", extra={"mode": self.mode, "listed": len(self.listed), "symbols": len(symbols),
+                                                "added": len(set(symbols) - set(self.symbols)),
+                                                "removed": len(set(self.symbols) - set(symbols))})
+            self.symbols = symbols
+            self.changed.set()
+            for cb in self.on_change:
+                cb()
+
+    async def run(self, stop_event: asyncio.Event):
+        if not self.dynamic:
+            return
+        period = min(getattr(settings, "UNIVERSE_REFRESH_SEC", 3600), getattr(settings, "UNIVERSE_STATS_SEC", 300))
+        while not stop_event.is_set():
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=period)
+            except asyncio.TimeoutError:
+                pass
+            if stop_event.is_set():
+                break
+            try:
+                await self.refresh()
+            except Exception as e:
+                log.warning("universe_refresh_error", extra={"error": str(e)})
+
+    async def prices(self) -> Dict[str, Tuple[float, int]]:
+        """One all-symbols ticker call: {symbol: (price, time_ms)}."""
+        return await self.binance.ticker_prices()
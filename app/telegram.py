@@ -1,32 +1,161 @@
 import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Tuple
 from aiogram import Bot, Dispatcher, types
-from aiogram.utils.exceptions import Throttled
+from aiogram.utils.exceptions import RetryAfter
 from aiogram.contrib.fsm_storage.memory import MemoryStorage
 import asyncio
 from .config import settings
+from . import metrics
+from .services.rate_limiter import TokenBucket
 
 log = logging.getLogger('telegram')
 
 bot = Bot(token=settings.TELEGRAM_BOT_TOKEN, parse_mode=types.ParseMode.HTML)
 dp = Dispatcher(bot, storage=MemoryStorage())
 
-_rate_lock = asyncio.Lock()
-_last_sent = 0.0
-_min_interval = 1.0  # one message per second global
+MAX_MESSAGE_LEN = 4096
+_SEP = "\n\n"
 
-async def send_signal_message(text: str):
-    global _last_sent
-    async with _rate_lock:
-        now = asyncio.get_event_loop().time()
-        delta = now - _last_sent
-        if delta < _min_interval:
-            await asyncio.sleep(_min_interval - delta)
+# (text, enqueued_at monotonic, attempts)
+_Item = Tuple[str, float, int]
+
+
+def _default_chat_ids() -> List[str]:
+    return [c.strip() for c in str(settings.TELEGRAM_CHAT_ID).split(",") if c.strip()]
+
+
+class TelegramOutbox:
+    """
+    Background delivery queue for signal messages.
+
+    Producers call `enqueue` and return immediately. Each chat has its own queue and
+    token bucket (TG_CHAT_RATE per second for private chats, TG_GROUP_RATE_PER_MIN
+    for groups/channels, whose ids start with "-"), all sharing a global bucket of
+    TG_GLOBAL_RATE messages per second. When several messages for a chat are waiting
+    for its next token they are joined into one message (up to 4096 chars).
+    `retry_after` from Telegram pauses that chat and the message is retried.
+    """
+
+    def __init__(self, chat_ids: Iterable[str] | None = None):
+        self.chat_ids = list(chat_ids) if chat_ids else _default_chat_ids()
+        self._queues: Dict[str, Deque[_Item]] = {}
+        self._wake: Dict[str, asyncio.Event] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._global = TokenBucket(rate=getattr(settings, "TG_GLOBAL_RATE", 30.0),
+                                   capacity=getattr(settings, "TG_GLOBAL_RATE", 30.0))
+        self._running = False
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.last_lag_ms = 0
+        self.max_lag_ms = 0
+
+    def enqueue(self, text: str, chat_ids: Iterable[str] | None = None) -> None:
+        now = time.monotonic()
+        for chat in chat_ids or self.chat_ids:
+            chat = str(chat)
+            self._queues.setdefault(chat, deque()).append((text, now, 0))
+            self._wake.setdefault(chat, asyncio.Event()).set()
+            if self._running and chat not in self._tasks:
+                self._tasks[chat] = asyncio.create_task(self._chat_loop(chat))
+
+    @property
+    def depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def stats(self) -> Dict[str, Any]:
+        oldest = min((q[0][1] for q in self._queues.values() if q), default=None)
+        return {
+            "depth": self.depth,
+            "per_chat": {c: len(q) for c, q in self._queues.items() if q},
+            "oldest_wait_ms": int((time.monotonic() - oldest) * 1000) if oldest is not None else 0,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "last_lag_ms": self.last_lag_ms,
+            "max_lag_ms": self.max_lag_ms,
+        }
+
+    async def run(self, stop_event: asyncio.Event):
+        self._running = True
+        for chat in list(self._queues):
+            if chat not in self._tasks:
+                self._tasks[chat] = asyncio.create_task(self._chat_loop(chat))
         try:
-            log.info('telegram_send', extra={'chat_id': settings.TELEGRAM_CHAT_ID})
-            await bot.send_message(chat_id=settings.TELEGRAM_CHAT_ID, text=text, disable_web_page_preview=True)
-        except Throttled:
-            log.warning('telegram_throttled')
-            await asyncio.sleep(_min_interval)
-            await bot.send_message(chat_id=settings.TELEGRAM_CHAT_ID, text=text, disable_web_page_preview=True)
+            await stop_event.wait()
+            # Give queued messages a short window to go out before shutdown
+            deadline = time.monotonic() + getattr(settings, "TG_DRAIN_SEC", 5.0)
+            while self.depth and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
         finally:
-            _last_sent = asyncio.get_event_loop().time()
+            self._running = False
+            tasks, self._tasks = list(self._tasks.values()), {}
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _bucket(self, chat: str) -> TokenBucket:
+        b = self._buckets.get(chat)
+        if b is None:
+            if chat.startswith("-"):
+                rate = getattr(settings, "TG_GROUP_RATE_PER_MIN", 20.0) / 60.0
+            else:
+                rate = getattr(settings, "TG_CHAT_RATE", 1.0)
+            b = self._buckets[chat] = TokenBucket(rate=rate, capacity=1)
+        return b
+
+    def _take(self, q: Deque[_Item]) -> _Item:
+        text, ts, attempts = q.popleft()
+        while q and len(text) + len(_SEP) + len(q[0][0]) <= MAX_MESSAGE_LEN:
+            text = text + _SEP + q.popleft()[0]
+            self.coalesced += 1
+        return text, ts, attempts
+
+    async def _chat_loop(self, chat: str):
+        q = self._queues[chat]
+        wake = self._wake[chat]
+        bucket = self._bucket(chat)
+        max_attempts = getattr(settings, "TG_SEND_RETRIES", 3)
+        while True:
+            if not q:
+                wake.clear()
+                await wake.wait()
+                continue
+            await bucket.acquire()
+            await self._global.acquire()
+            text, ts, attempts = self._take(q)
+            t0 = time.perf_counter()
+            try:
+                await bot.send_message(chat_id=chat, text=text, disable_web_page_preview=True)
+                metrics.TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - t0)
+            except RetryAfter as e:
+                log.warning('telegram_retry_after', extra={'chat_id': chat, 'retry_after': e.timeout})
+                q.appendleft((text, ts, attempts))
+                await asyncio.sleep(e.timeout)
+                continue
+            except Exception as e:
+                metrics.ERRORS.labels("telegram_send").inc()
+                if attempts + 1 >= max_attempts:
+                    self.dropped += 1
+                    log.error('telegram_send_error', extra={'chat_id': chat, 'error': str(e), 'dropped': True})
+                else:
+                    log.warning('telegram_send_error', extra={'chat_id': chat, 'error': str(e), 'attempt': attempts + 1})
+                    q.appendleft((text, ts, attempts + 1))
+                continue
+            lag = int((time.monotonic() - ts) * 1000)
+            self.sent += 1
+            self.last_lag_ms = lag
+            self.max_lag_ms = max(self.max_lag_ms, lag)
+            log.info('telegram_sent', extra={'chat_id': chat, 'lag_ms': lag, 'depth': len(q)})
+
+
+outbox = TelegramOutbox()
+metrics.QUEUE_DEPTH.labels("telegram").set_function(lambda: outbox.depth)
+
+
+async def send_signal_message(text: str):
+    """Queue a message for every configured chat; delivery happens in the outbox task."""
+    outbox.enqueue(text)
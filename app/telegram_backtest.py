@@ -1,5 +1,8 @@
 
 import logging
+import time
+from typing import List
+
 from aiogram import types
 from aiogram.dispatcher.filters import Command
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
@@ -18,6 +21,9 @@ except Exception:
 
 log = logging.getLogger("tg_backtest")
 
+# Minimum gap between progress edits of the status message
+EDIT_INTERVAL_SEC = 1.5
+
 def _kb():
     kb = InlineKeyboardMarkup(row_width=1)
     try:
@@ -51,22 +57,35 @@ async def backtest_click(c: types.CallbackQuery):
 
     interval = getattr(strat, "timeframe", "5m")
     pairs = getattr(settings, "PAIRS", ["BTCUSDT"])
+    # Answer the callback right away: the backtest itself can outlast Telegram's callback timeout
+    await c.answer()
+
+    from app.services.backtest_jobs import backtest_jobs, QueueFull
+    header = f"▶️ Бэктест '{name}' · {interval}\nПары: {', '.join(pairs)}\nПериод: 3 месяца\nКапитал: $100"
+    status = await c.message.answer(header)
+    done_lines: List[str] = []
+    last_edit = [0.0]
+
+    async def on_progress(sym, r, done, total):
+        done_lines.append(f"{sym}: {r['trades']} сделок, winrate {r['winrate']:.1f}%" if r else f"{sym}: ошибка")
+        now = time.monotonic()
+        # Telegram throttles edits of one message; the final result replaces it anyway
+        if done == total or now - last_edit[0] < EDIT_INTERVAL_SEC:
+            return
+        last_edit[0] = now
+        await status.edit_text(f"{header}\n\n⏳ {done}/{total}\n" + "\n".join(done_lines))
 
     try:
-        from app.services.backtest import run_backtest
-        await c.message.answer(
-            f"▶️ Бэктест '{name}' · {interval}\nПары: {', '.join(pairs)}\nПериод: 3 месяца\nКапитал: $100"
-        )
-        res = await run_backtest(name, strat, pairs, interval, months=3)
+        res = await backtest_jobs.submit(name, strat, pairs, interval, months=3, on_progress=on_progress)
         lines = [f"{sym}: {r['trades']} сделок, winrate {r['winrate']:.1f}%" for sym, r in res['per_symbol'].items()]
-        txt = (f"✅ *{res['strategy']}* · {res['interval']}\n"
+        txt = (f"✅ *{res['strategy']}* · {res['interval']}" + (" (из кэша)" if res.get("cached") else "") + "\n"
                f"Сделок: *{res['trades']}*, Winrate: *{res['winrate']:.1f}%*\n\n"
                + "\n".join(lines))
-        await c.message.answer(txt, parse_mode="Markdown")
+        await status.edit_text(txt, parse_mode="Markdown")
+    except QueueFull:
+        await status.edit_text(f"{header}\n\n⏸ Очередь бэктестов заполнена, попробуйте позже")
     except Exception as e:
         log.exception("backtest_failed", extra={"error": str(e)})
-        await c.message.answer(f"❌ Ошибка бэктеста: {e}")
-    finally:
-        await c.answer()
+        await status.edit_text(f"❌ Ошибка бэктеста: {e}")
 
 log.info("tg_backtest_handlers_registered")
@@ -1,133 +1,498 @@
-import asyncio, hashlib
-from typing import Dict, List
+import asyncio, hashlib, contextlib, time
+from typing import Any, Dict, List
 import aiohttp
 import logging
-from datetime import datetime
-from dateutil import tz
 
 from .config import settings
+from . import metrics
+from .services import http
 from .services.binance import BinanceClient
+from .services.binance_ws import KlineStreamManager
+from .services.kline_matrix import KlineMatrix
+from .services.kline_store import KlineSeries, KlineStore
 from .services.redis_queue import RedisClient
 from .services.supabase import SupabaseClient
+from .services.persister import SignalPersister
+from .services.dedup import Deduper
+from .services.scheduler import CandleScheduler
+from .services.sharding import ShardCoordinator
+from .services.snapshot import Snapshotter
+from .services.strategy_guard import strategy_guard
+from .services.universe import Universe
+from .services.sessions import ny_calendar, kyiv_calendar
 from .services.strategies import STRATEGIES
 from .services.indicators import atr
-from .telegram import send_signal_message
+from .services import indicators_np
+from .telegram import send_signal_message, outbox
 
 log = logging.getLogger("worker")
 
-NY_TZ = tz.gettz("America/New_York")
-UA_TZ = tz.gettz("Europe/Kyiv")
+# Lease that decides which replica evaluates the price-only strategies
+TICKER_SHARD = ("*", "ticker")
 
 def _fmt_entry_time(ts_ms: int | None) -> str:
     if not ts_ms:
         return "—"
-    dt_utc = datetime.utcfromtimestamp(ts_ms/1000).replace(tzinfo=tz.UTC)
-    dt_ny  = dt_utc.astimezone(NY_TZ)
-    dt_ua  = dt_utc.astimezone(UA_TZ)
-    return f"{dt_ny:%H:%M} NY | {dt_ua:%H:%M} Kyiv ({dt_ua:%d %b})"
+    _, ny_h, ny_m = ny_calendar.wall_clock(ts_ms)
+    ua_day, ua_h, ua_m = kyiv_calendar.wall_clock(ts_ms)
+    return f"{ny_h:02d}:{ny_m:02d} NY | {ua_h:02d}:{ua_m:02d} Kyiv ({ua_day:%d %b})"
 
 def _dedup_key(symbol: str, strat_name: str, side: str, candle_close_ms: int | None) -> str:
     base = f"{symbol}|{strat_name}|{side}|{candle_close_ms or ''}"
     return "sig:" + hashlib.sha1(base.encode()).hexdigest()
 
-async def run_worker(stop_event: asyncio.Event):
-    redis = RedisClient()
-    pairs: List[str] = getattr(settings, "PAIRS", ["BTCUSDT"])
+def _last_atr(kl: List[List], series: KlineSeries | None = None) -> float | None:
+    n = len(kl)
+    if series is None or len(series) < n or series.rows[n - 1][0] != kl[-1][0]:
+        atr_vals = atr(kl, period=14)
+        return atr_vals[-1] if atr_vals and atr_vals[-1] is not None else None
+
+    def calc():
+        # `kl` is a prefix of the series window (the whole of it in poll mode)
+        last = float(indicators_np.atr(series.array()[:n], period=14)[-1])
+        return None if last != last else last
+    # Shared by every strategy reading the same window
+    return series.memo(("atr14", n, kl[-1][0]), calc)
+
+def _split_strategies(strategies) -> tuple[list, list]:
+    """(kline strategies, price-only strategies evaluated from the all-symbols ticker)."""
+    if not getattr(settings, "TICKER_PREFILTER_ENABLED", True):
+        return list(strategies), []
+    ticker = [s for s in strategies if hasattr(s, "run_ticker")]
+    return [s for s in strategies if not hasattr(s, "run_ticker")], ticker
+
+def _split_matrix(strategies) -> tuple[list, list]:
+    """(per-symbol strategies, cross-sectional ones evaluated through `run_matrix`)."""
+    if not getattr(settings, "MATRIX_EVAL_ENABLED", True):
+        return list(strategies), []
+    matrix = [s for s in strategies if hasattr(s, "run_matrix")]
+    return [s for s in strategies if not hasattr(s, "run_matrix")], matrix
+
+def _group_by_timeframe(strategies) -> Dict[str, list]:
+    by_tf: Dict[str, list] = {}
+    for strat in strategies:
+        by_tf.setdefault(getattr(strat, "timeframe", "5m"), []).append(strat)
+    return by_tf
+
+def _evaluate(strat, symbol: str, kl: List[List], series: KlineSeries | None = None) -> List[Dict[str, Any]]:
+    """Run one strategy over one kline window; returns candidates with their dedup key, row and message."""
+    if not kl or len(kl) < 3:
+        return []
+    signals = _timed_run(strat, symbol, int(kl[-1][6]), strat.run, kl, symbol)
+    if not signals:
+        return []
+    # ATR for fallback SL/TP
+    return _candidates(strat, symbol, signals, float(kl[-1][4]), int(kl[-1][6]), _last_atr(kl, series))
+
+def _evaluate_ticker(strat, symbol: str, price: float, ts_ms: int) -> List[Dict[str, Any]]:
+    """Run a price-only strategy on one ticker price; same candidate shape as `_evaluate`."""
+    signals = _timed_run(strat, symbol, ts_ms, strat.run_ticker, price, symbol)
+    if not signals:
+        return []
+    return _candidates(strat, symbol, signals, price, ts_ms, None)
+
+def _timed_run(strat, symbol: str, tick: int, fn, *args) -> List[Dict[str, Any]]:
+    name = getattr(strat, "name", "")
+    if not strategy_guard.allow(name, symbol, tick):
+        return []
+    t0 = time.perf_counter()
+    try:
+        return fn(*args) or []
+    finally:
+        elapsed = time.perf_counter() - t0
+        metrics.STRATEGY_RUN_SECONDS.labels(name).observe(elapsed)
+        strategy_guard.record(name, elapsed, symbol)
+
+def _candidates(strat, symbol: str, signals: List[Dict[str, Any]], last_close: float, last_close_ms: int,
+                last_atr: float | None) -> List[Dict[str, Any]]:
+    tf = getattr(strat, "timeframe", "5m")
+    out: List[Dict[str, Any]] = []
+    for sig in signals:
+        side = sig.get("side")
+        if side not in ("LONG", "SHORT"):
+            continue
+
+        entry = sig.get("entry", last_close)
+        sl = sig.get("sl")
+        tp = sig.get("tp")
+
+        if sl is None or tp is None:
+            if last_atr:
+                mult_sl = getattr(settings, "ATR_SL_MULT", 1.0)
+                mult_tp = getattr(settings, "ATR_TP_MULT", 2.0)
+                if side == "LONG":
+                    sl = entry - mult_sl * last_atr
+                    tp = entry + mult_tp * last_atr
+                else:
+                    sl = entry + mult_sl * last_atr
+                    tp = entry - mult_tp * last_atr
+            else:
+                # fallback static 0.5% / 1%
+                if side == "LONG":
+                    sl = entry * 0.995
+                    tp = entry * 1.01
+                else:
+                    sl = entry * 1.005
+                    tp = entry * 0.99
+
+        entry_time_ms = sig.get("entry_time_ms", last_close_ms)
 
-    async with aiohttp.ClientSession() as session:
-        binance = BinanceClient('https://fapi.binance.com', session)
-        supa = SupabaseClient(session)
-        keepalive_task = asyncio.create_task(_keepalive_loop(session, stop_event))
+        row = {
+            "symbol": sig.get("symbol", symbol),
+            "side": side,
+            "reason": sig.get("reason", ""),
+            "strategy": getattr(strat, "name", ""),
+            "timeframe": tf,
+            "entry": entry,
+            "sl": sl,
+            "tp": tp,
+            "entry_time_ms": entry_time_ms,
+        }
+
+        # Message text
+        rr = abs((tp - entry) / (entry - sl)) if (entry != sl) else 0.0
+        side_emoji = "🟢 LONG" if side == "LONG" else "🔴 SHORT"
+        lines = [
+            f"<b>{side_emoji} {sig.get('symbol', symbol)}</b>",
+            f"⏱ Entry time: { _fmt_entry_time(entry_time_ms) }",
+            f"📈 Entry: <b>{entry:.4f}</b>",
+            f"🎯 TP: {tp:.4f}   🛡 SL: {sl:.4f}   R:R <b>{rr:.2f}</b>",
+            f"🧠 {getattr(strat, 'name', '')} · {tf}",
+        ]
+        rsn = sig.get("reason")
+        if rsn:
+            lines.append(f"📝 {rsn}")
+
+        out.append({
+            # Dedup per symbol/strategy/side/candle
+            "key": _dedup_key(sig.get("symbol", symbol), getattr(strat, "name", "unknown"), side, entry_time_ms),
+            "row": row,
+            "text": "\n".join(lines),
+        })
+    return out
+
+def _evaluate_matrix(strat, ready: List[tuple], tick: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Run a cross-sectional strategy over (symbol, window, series) entries: one `run_matrix`
+    call per window length (normally one for the whole universe); same candidates as `_evaluate`.
+    """
+    name = getattr(strat, "name", "")
+    groups: Dict[int, List[tuple]] = {}
+    for entry in ready:
+        if len(entry[1]) >= 3:
+            groups.setdefault(len(entry[1]), []).append(entry)
+    out: List[Dict[str, Any]] = []
+    if not groups or not strategy_guard.allow(name, "*", _matrix_tick(ready) if tick is None else tick):
+        return out
+    for group in groups.values():
+        m = KlineMatrix([symbol for symbol, _, _ in group], [kl for _, kl, _ in group])
+        t0 = time.perf_counter()
         try:
-            while not stop_event.is_set():
-                for strat in STRATEGIES:
-                    tf = getattr(strat, "timeframe", "5m")
-                    for symbol in pairs:
-                        try:
-                            kl = await binance.get_klines(symbol, tf, limit=300)
-                            if not kl or len(kl) < 3:
-                                continue
-                            signals = strat.run(kl, symbol) or []
-
-                            # Precompute ATR for fallback SL/TP
-                            atr_vals = atr(kl, period=14)
-                            last_atr = atr_vals[-1] if atr_vals and atr_vals[-1] is not None else None
-                            last_close = float(kl[-1][4])
-                            last_close_ms = int(kl[-1][6])
-
-                            for sig in signals:
-                                side = sig.get("side")
-                                if side not in ("LONG", "SHORT"):
-                                    continue
-
-                                entry = sig.get("entry", last_close)
-                                sl = sig.get("sl")
-                                tp = sig.get("tp")
-
-                                if sl is None or tp is None:
-                                    if last_atr:
-                                        mult_sl = getattr(settings, "ATR_SL_MULT", 1.0)
-                                        mult_tp = getattr(settings, "ATR_TP_MULT", 2.0)
-                                        if side == "LONG":
-                                            sl = entry - mult_sl * last_atr
-                                            tp = entry + mult_tp * last_atr
-                                        else:
-                                            sl = entry + mult_sl * last_atr
-                                            tp = entry - mult_tp * last_atr
-                                    else:
-                                        # fallback static 0.5% / 1%
-                                        if side == "LONG":
-                                            sl = entry * 0.995
-                                            tp = entry * 1.01
-                                        else:
-                                            sl = entry * 1.005
-                                            tp = entry * 0.99
-
-                                entry_time_ms = sig.get("entry_time_ms", last_close_ms)
-
-                                # Dedup per symbol/strategy/side/candle
-                                key = _dedup_key(sig.get("symbol", symbol), getattr(strat, "name", "unknown"), side, entry_time_ms)
-                                fresh = await redis.try_set(key, getattr(settings, "DEDUP_TTL_SEC", 3600))
-                                if not fresh:
-                                    continue
-
-                                # Persist
-                                await supa.insert_signal({
-                                    "symbol": sig.get("symbol", symbol),
-                                    "side": side,
-                                    "reason": sig.get("reason", ""),
-                                    "strategy": getattr(strat, "name", ""),
-                                    "timeframe": tf,
-                                    "entry": entry,
-                                    "sl": sl,
-                                    "tp": tp,
-                                    "entry_time_ms": entry_time_ms,
-                                })
-
-                                # Message text
-                                rr = abs((tp - entry) / (entry - sl)) if (entry != sl) else 0.0
-                                side_emoji = "🟢 LONG" if side == "LONG" else "🔴 SHORT"
-                                lines = [
-                                    f"<b>{side_emoji} {sig.get('symbol', symbol)}</b>",
-                                    f"⏱ Entry time: { _fmt_entry_time(entry_time_ms) }",
-                                    f"📈 Entry: <b>{entry:.4f}</b>",
-                                    f"🎯 TP: {tp:.4f}   🛡 SL: {sl:.4f}   R:R <b>{rr:.2f}</b>",
-                                    f"🧠 {getattr(strat, 'name', '')} · {tf}",
-                                ]
-                                rsn = sig.get("reason")
-                                if rsn:
-                                    lines.append(f"📝 {rsn}")
-                                await send_signal_message("\n".join(lines))
-
-                        except Exception as e:
-                            log.exception("strategy_loop_error", extra={"strategy": getattr(strat, "name", ""), "symbol": symbol})
-
-                await asyncio.sleep(getattr(settings, "POLL_INTERVAL_SEC", 5.0))
+            by_symbol = strat.run_matrix(m) or {}
+        except Exception:
+            log.exception("strategy_loop_error", extra={"strategy": name, "symbols": len(group)})
+            metrics.STRATEGY_ERRORS.labels(name, "*").inc()
+            continue
         finally:
-            keepalive_task.cancel()
-            with contextlib.suppress(Exception):
-                await keepalive_task
-import contextlib
+            # Per-symbol share, so timings and budgets stay comparable with `run`
+            elapsed = (time.perf_counter() - t0) / len(group)
+            metrics.STRATEGY_RUN_SECONDS.labels(name).observe(elapsed)
+            strategy_guard.record(name, elapsed, "*")
+        for symbol, kl, series in group:
+            signals = by_symbol.get(symbol)
+            if signals:
+                out.extend(_guarded(_candidates, strat, symbol, signals, float(kl[-1][4]), int(kl[-1][6]),
+                                    _last_atr(kl, series)))
+    return out
+
+def _matrix_tick(ready: List[tuple]) -> int:
+    """The latest close time among the entries: one guard opportunity per cross-sectional pass."""
+    return max((int(kl[-1][6]) for _, kl, _ in ready if kl), default=0)
+
+def _safe_evaluate(strat, symbol: str, kl: List[List], series: KlineSeries | None = None) -> List[Dict[str, Any]]:
+    return _guarded(_evaluate, strat, symbol, kl, series)
+
+def _guarded(evaluate, strat, symbol: str, *args) -> List[Dict[str, Any]]:
+    try:
+        return evaluate(strat, symbol, *args)
+    except Exception:
+        log.exception("strategy_loop_error", extra={"strategy": getattr(strat, "name", ""), "symbol": symbol})
+        metrics.STRATEGY_ERRORS.labels(getattr(strat, "name", ""), symbol).inc()
+        return []
+
+async def _dispatch(candidates: List[Dict[str, Any]], dedup: Deduper, persister: SignalPersister):
+    """Dedup a batch of candidates in one round trip, then persist and queue the fresh ones."""
+    if not candidates:
+        return
+    fresh = await dedup.check_many([c["key"] for c in candidates])
+    for cand, is_fresh in zip(candidates, fresh):
+        row = cand["row"]
+        if not is_fresh:
+            metrics.DEDUP_HITS.labels(row["strategy"], row["symbol"]).inc()
+            continue
+        metrics.SIGNALS.labels(row["strategy"], row["symbol"]).inc()
+        # Persist (write-behind; never waits on Supabase)
+        persister.submit(row)
+        await send_signal_message(cand["text"])
+
+async def _scan_series(binance: BinanceClient, store: KlineStore, symbol: str, tf: str, strategies: list,
+                       sem: asyncio.Semaphore, ready: List[tuple] | None = None) -> List[Dict[str, Any]]:
+    async with sem:
+        # One incremental fetch per (symbol, timeframe) serves every strategy on it
+        try:
+            series = await store.refresh(binance, symbol, tf)
+        except Exception:
+            log.exception("kline_refresh_error", extra={"symbol": symbol, "timeframe": tf})
+            metrics.ERRORS.labels("kline_refresh").inc()
+            return []
+        kl = series.window()
+        if ready is not None:
+            # Left for the cross-sectional strategies, evaluated once all symbols are in
+            ready.append((symbol, kl, series))
+        out: List[Dict[str, Any]] = []
+        for strat in strategies:
+            out.extend(_safe_evaluate(strat, symbol, kl, series))
+        return out
+
+def _closed_window(kl: List[List], boundary: int) -> List[List]:
+    """Drop the in-progress candle (the one opened at `boundary` or later)."""
+    end = len(kl)
+    while end and int(kl[end - 1][0]) >= boundary:
+        end -= 1
+    return kl if end == len(kl) else kl[:end]
+
+async def _scan_closed(binance: BinanceClient, store: KlineStore, scheduler: CandleScheduler, symbol: str, tf: str,
+                       strategies: list, sem: asyncio.Semaphore,
+                       ready: List[tuple] | None = None) -> tuple[List[Dict[str, Any]], bool]:
+    """Evaluate strategies whose last closed candle advanced; also reports whether the expected close is in."""
+    async with sem:
+        try:
+            series = await store.refresh(binance, symbol, tf)
+        except Exception:
+            log.exception("kline_refresh_error", extra={"symbol": symbol, "timeframe": tf})
+            metrics.ERRORS.labels("kline_refresh").inc()
+            return [], False
+        boundary = scheduler.boundary(tf)
+        kl = _closed_window(series.window(), boundary)
+        if not kl:
+            return [], False
+        close_ms = int(kl[-1][6])
+        if ready is not None:
+            ready.append((symbol, kl, series))
+        out: List[Dict[str, Any]] = []
+        for strat in strategies:
+            name = getattr(strat, "name", "")
+            # Ask the guard first: a candle it skips must not be marked as evaluated
+            if strategy_guard.allow(name, symbol, close_ms) and scheduler.advance(symbol, name, close_ms):
+                out.extend(_safe_evaluate(strat, symbol, kl, series))
+        return out, close_ms >= boundary - 1
+
+def _owned(shards: ShardCoordinator | None, symbol: str, tf: str) -> bool:
+    return shards is None or shards.owns(symbol, tf)
+
+async def _candle_loop(binance: BinanceClient, store: KlineStore, dedup: Deduper, persister: SignalPersister,
+                       universe: Universe, stop_event: asyncio.Event, shards: ShardCoordinator | None = None):
+    by_tf = _group_by_timeframe(_split_strategies(STRATEGIES)[0])
+    if not by_tf:
+        await stop_event.wait()
+        return
+    split = {tf: _split_matrix(strats) for tf, strats in by_tf.items()}
+    sem = asyncio.Semaphore(max(1, int(getattr(settings, "WORKER_CONCURRENCY", 8))))
+    scheduler = CandleScheduler(binance, by_tf)
+    retries = int(getattr(settings, "CANDLE_CLOSE_RETRIES", 3))
+    while not stop_event.is_set():
+        due = await scheduler.wait_next(stop_event)
+        t0 = time.monotonic()
+        pending = [(symbol, tf) for tf in due for symbol in universe.symbols if _owned(shards, symbol, tf)]
+        for attempt in range(retries + 1):
+            if not pending or stop_event.is_set():
+                break
+            if attempt:
+                # The exchange can publish the closed candle slightly late
+                await asyncio.sleep(getattr(settings, "CANDLE_RETRY_SEC", 1.0))
+            ready: Dict[str, List[tuple]] = {tf: [] for tf in due}
+            results = await asyncio.gather(*(
+                _scan_closed(binance, store, scheduler, symbol, tf, split[tf][0], sem, ready[tf]) for symbol, tf in pending
+            ))
+            candidates = [c for r, _ in results for c in r]
+            for tf, entries in ready.items():
+                for strat in split[tf][1]:
+                    name = getattr(strat, "name", "")
+                    tick = _matrix_tick(entries)
+                    if not entries or not strategy_guard.allow(name, "*", tick):
+                        continue
+                    advanced = [e for e in entries if scheduler.advance(e[0], name, int(e[1][-1][6]))]
+                    candidates.extend(_evaluate_matrix(strat, advanced, tick))
+            await _dispatch(candidates, dedup, persister)
+            pending = [key for key, (_, done) in zip(pending, results) if not done]
+        if pending:
+            log.warning("candle_close_missing", extra={"pairs": len(pending), "timeframes": sorted({tf for _, tf in pending})})
+        metrics.CYCLE_SECONDS.labels("candle").set(time.monotonic() - t0)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("worker_cycle", extra={"timeframes": due, "elapsed_ms": int((time.monotonic() - t0) * 1000),
+                                             "close_lag_ms": scheduler.now_ms() - max(scheduler.boundary(tf) for tf in due) if due else 0,
+                                             "limiter": binance.limiter.snapshot(), "dedup": dedup.stats(),
+                                             "persist": persister.stats(), "outbox": outbox.stats()})
+
+async def _poll_loop(binance: BinanceClient, store: KlineStore, dedup: Deduper, persister: SignalPersister,
+                     universe: Universe, stop_event: asyncio.Event, shards: ShardCoordinator | None = None):
+    by_tf = _group_by_timeframe(_split_strategies(STRATEGIES)[0])
+    if not by_tf:
+        await stop_event.wait()
+        return
+    split = {tf: _split_matrix(strats) for tf, strats in by_tf.items()}
+    sem = asyncio.Semaphore(max(1, int(getattr(settings, "WORKER_CONCURRENCY", 8))))
+    while not stop_event.is_set():
+        t0 = time.monotonic()
+        ready: Dict[str, List[tuple]] = {tf: [] for tf in by_tf}
+        results = await asyncio.gather(*(
+            _scan_series(binance, store, symbol, tf, split[tf][0], sem, ready[tf])
+            for tf in by_tf for symbol in universe.symbols if _owned(shards, symbol, tf)
+        ))
+        candidates = [c for r in results for c in r]
+        for tf, entries in ready.items():
+            for strat in split[tf][1]:
+                candidates.extend(_evaluate_matrix(strat, entries))
+        await _dispatch(candidates, dedup, persister)
+        metrics.CYCLE_SECONDS.labels("poll").set(time.monotonic() - t0)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("worker_cycle", extra={"elapsed_ms": int((time.monotonic() - t0) * 1000),
+                                             "limiter": binance.limiter.snapshot(), "dedup": dedup.stats(),
+                                             "persist": persister.stats(), "outbox": outbox.stats()})
+
+        await asyncio.sleep(getattr(settings, "POLL_INTERVAL_SEC", 5.0))
+
+async def _ticker_loop(universe: Universe, strategies: list, dedup: Deduper, persister: SignalPersister,
+                       stop_event: asyncio.Event, shards: ShardCoordinator | None = None):
+    """Price-only strategies: one all-symbols ticker call per POLL_INTERVAL_SEC, no klines."""
+    while not stop_event.is_set():
+        t0 = time.monotonic()
+        if _owned(shards, *TICKER_SHARD):
+            try:
+                prices = await universe.prices()
+            except Exception:
+                log.exception("ticker_prices_error")
+                metrics.ERRORS.labels("ticker_prices").inc()
+            else:
+                candidates: List[Dict[str, Any]] = []
+                for symbol in universe.symbols:
+                    quote = prices.get(symbol)
+                    if quote is None:
+                        continue
+                    for strat in strategies:
+                        candidates.extend(_guarded(_evaluate_ticker, strat, symbol, quote[0], quote[1]))
+                await _dispatch(candidates, dedup, persister)
+        metrics.CYCLE_SECONDS.labels("ticker").set(time.monotonic() - t0)
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=getattr(settings, "POLL_INTERVAL_SEC", 5.0))
+        except asyncio.TimeoutError:
+            pass
+
+async def _stream_loop(binance: BinanceClient, session: aiohttp.ClientSession, store: KlineStore,
+                       dedup: Deduper, persister: SignalPersister, universe: Universe, stop_event: asyncio.Event,
+                       shards: ShardCoordinator | None = None):
+    by_tf = _group_by_timeframe(_split_strategies(STRATEGIES)[0])
+
+    async def on_closed(symbol: str, tf: str, kl: List[List]):
+        # Windows handed over here end at the candle that just closed
+        series = store.series(symbol, tf)
+        candidates: List[Dict[str, Any]] = []
+        for strat in by_tf.get(tf, []):
+            candidates.extend(_safe_evaluate(strat, symbol, kl, series))
+        await _dispatch(candidates, dedup, persister)
+
+    # Subscriptions follow the universe and the shards this replica holds; resubscribe when either changes
+    while not stop_event.is_set():
+        universe.changed.clear()
+        if shards is not None:
+            shards.changed.clear()
+        keys = [(symbol, tf) for tf in by_tf for symbol in universe.symbols if _owned(shards, symbol, tf)]
+        restart = asyncio.Event()
+        manager = KlineStreamManager(binance, session, keys, on_closed, store=store) if keys else None
+        run_task = asyncio.create_task(manager.run(restart) if manager else restart.wait())
+        waits = [asyncio.create_task(stop_event.wait()), asyncio.create_task(universe.changed.wait())]
+        if shards is not None:
+            waits.append(asyncio.create_task(shards.changed.wait()))
+        await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        restart.set()
+        for t in waits:
+            t.cancel()
+        await asyncio.gather(run_task, *waits, return_exceptions=True)
+
+async def run_worker(stop_event: asyncio.Event):
+    redis = RedisClient()
+    mode = (getattr(settings, "MARKET_DATA_MODE", "rest") or "rest").lower()
+    kline_strategies, ticker_strategies = _split_strategies(STRATEGIES)
+
+    session = http.session()
+    binance = BinanceClient(getattr(settings, "BINANCE_BASE", "https://fapi.binance.com"), session)
+    supa = SupabaseClient(session)
+    persister = SignalPersister(supa, redis)
+    metrics.QUEUE_DEPTH.labels("persist").set_function(lambda: persister.depth)
+    dedup = Deduper(redis)
+    store = KlineStore()
+    keepalive_task = asyncio.create_task(_keepalive_loop(session, stop_event))
+    persist_stop = asyncio.Event()
+    persist_task = asyncio.create_task(persister.run(persist_stop))
+    outbox_task = asyncio.create_task(outbox.run(persist_stop))
+    universe = Universe(binance)
+    try:
+        await universe.refresh()
+    except Exception as e:
+        log.warning("universe_refresh_error", extra={"error": str(e)})
+    background = [persist_task, outbox_task, asyncio.create_task(universe.run(persist_stop))]
+
+    def shard_keys() -> List[tuple]:
+        keys = [(symbol, tf) for tf in _group_by_timeframe(kline_strategies) for symbol in universe.symbols]
+        return keys + [TICKER_SHARD] if ticker_strategies else keys
+
+    shards = None
+    if getattr(settings, "SHARDING_ENABLED", False):
+        shards = ShardCoordinator(redis, shard_keys())
+        universe.on_change.append(lambda: shards.set_shards(shard_keys()))
+        with contextlib.suppress(Exception):
+            await shards.tick()
+        # Leases are released once the scan loop has stopped
+        background.append(asyncio.create_task(shards.run(persist_stop)))
+    snapshots = None
+    if getattr(settings, "SNAPSHOT_ENABLED", True):
+        snapshots = Snapshotter(redis, store, STRATEGIES, owns=shards.owns if shards else None)
+        await snapshots.restore([k for k in shard_keys() if k != TICKER_SHARD and _owned(shards, *k)])
+        snapshot_task = asyncio.create_task(snapshots.run(stop_event))
+    log.info("worker_start", extra={"mode": mode, "schedule": getattr(settings, "SCHEDULE_MODE", "candle"),
+                                    "symbols": len(universe.symbols), "universe": universe.mode,
+                                    "strategies": len(kline_strategies), "ticker_strategies": len(ticker_strategies),
+                                    "shards": shards.stats() if shards else None})
+    ticker_task = None
+    if ticker_strategies:
+        ticker_task = asyncio.create_task(_ticker_loop(universe, ticker_strategies, dedup, persister, stop_event, shards))
+    try:
+        if mode == "ws":
+            await _stream_loop(binance, session, store, dedup, persister, universe, stop_event, shards)
+        elif (getattr(settings, "SCHEDULE_MODE", "candle") or "candle").lower() == "candle":
+            await _candle_loop(binance, store, dedup, persister, universe, stop_event, shards)
+        else:
+            await _poll_loop(binance, store, dedup, persister, universe, stop_event, shards)
+    finally:
+        if ticker_task is not None:
+            if not stop_event.is_set():
+                ticker_task.cancel()
+            await asyncio.gather(ticker_task, return_exceptions=True)
+        keepalive_task.cancel()
+        # gather, not a bare await: awaiting a cancelled task raises CancelledError past the steps below
+        await asyncio.gather(keepalive_task, return_exceptions=True)
+        if snapshots is not None:
+            # The scan loop may have raised without setting stop_event, and the snapshot loop only ends on it
+            if not stop_event.is_set():
+                snapshot_task.cancel()
+            await asyncio.gather(snapshot_task, return_exceptions=True)
+            # Final snapshot of what the scan loop left behind, for the next start
+            await snapshots.save()
+        # Stopping the persister flushes whatever is still buffered; the outbox drains briefly
+        persist_stop.set()
+        with contextlib.suppress(Exception):
+            await asyncio.gather(*background)
+
 async def _keepalive_loop(session: aiohttp.ClientSession, stop_event: asyncio.Event):
     # Self-ping health endpoint to prevent idling
     if not (getattr(settings, 'PUBLIC_URL', None) or getattr(settings, 'KOYEB_APP_URL', None)):
@@ -136,7 +501,7 @@ async def _keepalive_loop(session: aiohttp.ClientSession, stop_event: asyncio.Ev
     url = f"{base}/healthz"
     while not stop_event.is_set():
         try:
-            async with session.get(url, timeout=5) as r:
+            async with session.get(url, timeout=http.timeout(5)) as r:
                 _ = await r.text()
         except Exception:
             pass
@@ -0,0 +1,16 @@
+"""
+Benchmark harness (not a test suite): `python -m bench.run`.
+
+Settings are read at import time, so harmless placeholders are filled in for the
+required secrets before anything from `app` is imported. Nothing here talks to
+the real Binance, Redis, Supabase or Telegram.
+"""
+import os
+
+for _key, _value in {
+    "BINANCE_API_KEY": "bench", "BINANCE_API_SECRET": "bench",
+    "TELEGRAM_BOT_TOKEN": "123456:bench-placeholder-token", "TELEGRAM_CHAT_ID": "1",
+    "SUPABASE_SERVICE_KEY": "bench", "SUPABASE_URL": "http://127.0.0.1:9",
+    "REDIS_URL": "redis://127.0.0.1:9/0",
+}.items():
+    os.environ.setdefault(_key, _value)
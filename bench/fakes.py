@@ -0,0 +1,201 @@
+"""In-process stand-ins for Binance REST and kline streams, Supabase and Redis used by the end-to-end benchmarks."""
+import asyncio
+import json
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Tuple
+
+from aiohttp import web
+
+from app.services.binance import interval_ms
+from app.services.binance_ws import stream_name
+
+from . import synthetic
+
+
+class FakeExchange:
+    """
+    Local HTTP server speaking the subset of the Binance futures and PostgREST APIs
+    the app uses: /fapi/v1/klines, /fapi/v1/time, /fapi/v1/ticker/price,
+    /fapi/v1/ticker/24hr, /fapi/v1/exchangeInfo and POST /rest/v1/signals, plus the
+    combined kline stream at /stream?streams=<symbol>@kline_<tf>/... (point
+    BINANCE_WS_BASE at `ws_url`). Klines come from `synthetic.klines`, anchored so
+    the last candle is in progress at the current time.
+
+    `shift_ms` moves the exchange clock forward, so candles can close without
+    waiting for them. Stream events are only sent by `push_kline`; `drop_streams`
+    closes every stream connection, as Binance does on its 24h cut or a network
+    blip.
+    """
+
+    def __init__(self, symbols: List[str] | None = None, history_days: int = 40):
+        self.symbols = list(symbols or ["BTCUSDT", "ETHUSDT", "SOLUSDT"])
+        self.history_days = history_days
+        self.inserted = 0
+        self.requests = 0
+        self._series: Dict[Tuple[str, str], Tuple[List[int], List[List[Any]]]] = {}
+        self._runner: web.AppRunner | None = None
+        self._sockets: Dict[web.WebSocketResponse, set] = {}
+        self._connected = asyncio.Condition()
+        self.shift_ms = 0
+        self.url = ""
+
+    @property
+    def ws_url(self) -> str:
+        return "ws" + self.url[len("http"):]
+
+    def now_ms(self) -> int:
+        return int(time.time() * 1000) + self.shift_ms
+
+    def series(self, symbol: str, interval: str) -> Tuple[List[int], List[List[Any]]]:
+        key = (symbol, interval)
+        if key not in self._series:
+            step = interval_ms(interval)
+            now = int(time.time() * 1000)
+            start = (now - self.history_days * 86_400_000) // step * step
+            n = (now - start) // step + 24 * 3_600_000 // step
+            rows = synthetic.klines(n, interval, seed=zlib.crc32(symbol.encode()), start_ms=start)
+            self._series[key] = ([r[0] for r in rows], rows)
+        return self._series[key]
+
+    async def _klines(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        q = request.query
+        opens, rows = self.series(q["symbol"], q["interval"])
+        limit = min(int(q.get("limit", 500)), 1500)
+        end = int(q.get("endTime", self.now_ms()))
+        hi = bisect_right(opens, end)
+        if "startTime" in q:
+            lo = bisect_left(opens, int(q["startTime"]))
+            page = rows[lo:min(hi, lo + limit)]
+        else:
+            page = rows[max(0, hi - limit):hi]
+        return web.json_response(page)
+
+    async def _time(self, request: web.Request) -> web.Response:
+        return web.json_response({"serverTime": self.now_ms()})
+
+    def _last(self, symbol: str) -> Tuple[int, List[List[Any]]]:
+        opens, rows = self.series(symbol, "1m")
+        return bisect_right(opens, self.now_ms()) - 1, rows
+
+    async def _ticker(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        now = self.now_ms()
+        quotes = []
+        for symbol in ([request.query["symbol"]] if "symbol" in request.query else self.symbols):
+            i, rows = self._last(symbol)
+            quotes.append({"symbol": symbol, "price": rows[i][4], "time": now})
+        return web.json_response(quotes[0] if "symbol" in request.query else quotes)
+
+    async def _ticker_24hr(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        out = []
+        for symbol in self.symbols:
+            i, rows = self._last(symbol)
+            day = rows[max(0, i - 1439):i + 1]
+            out.append({"symbol": symbol, "lastPrice": day[-1][4], "openPrice": day[0][1],
+                        "highPrice": str(max(float(r[2]) for r in day)), "lowPrice": str(min(float(r[3]) for r in day)),
+                        "quoteVolume": str(sum(float(r[7]) for r in day))})
+        return web.json_response(out)
+
+    async def _exchange_info(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        return web.json_response({"symbols": [
+            {"symbol": s, "contractType": "PERPETUAL", "quoteAsset": "USDT", "status": "TRADING"} for s in self.symbols
+        ]})
+
+    async def _insert(self, request: web.Request) -> web.Response:
+        self.inserted += len(await request.json())
+        return web.Response(status=201)
+
+    async def _stream(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async with self._connected:
+            self._sockets[ws] = set(request.query.get("streams", "").split("/"))
+            self._connected.notify_all()
+        try:
+            async for _ in ws:  # clients only listen
+                pass
+        finally:
+            self._sockets.pop(ws, None)
+        return ws
+
+    async def wait_streams(self, n: int = 1, timeout: float = 10.0) -> None:
+        """Until `n` stream connections are open."""
+        async with self._connected:
+            await asyncio.wait_for(self._connected.wait_for(lambda: len(self._sockets) >= n), timeout)
+
+    async def push_kline(self, symbol: str, interval: str, final: bool = True) -> List[Any]:
+        """Send the candle in progress at the exchange clock as a kline event (`x` = `final`); returns its row."""
+        opens, rows = self.series(symbol, interval)
+        row = rows[bisect_right(opens, self.now_ms()) - 1]
+        name = stream_name(symbol, interval)
+        k = {"t": row[0], "T": row[6], "s": symbol, "i": interval, "o": row[1], "h": row[2], "l": row[3],
+             "c": row[4], "v": row[5], "n": row[8], "x": final, "q": row[7], "V": row[9], "Q": row[10], "B": row[11]}
+        raw = json.dumps({"stream": name, "data": {"e": "kline", "E": self.now_ms(), "s": symbol, "k": k}})
+        for ws, streams in list(self._sockets.items()):
+            if name in streams and not ws.closed:
+                await ws.send_str(raw)
+        return row
+
+    async def drop_streams(self) -> None:
+        for ws in list(self._sockets):
+            await ws.close()
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/fapi/v1/klines", self._klines)
+        app.router.add_get("/fapi/v1/time", self._time)
+        app.router.add_get("/fapi/v1/ticker/price", self._ticker)
+        app.router.add_get("/fapi/v1/ticker/24hr", self._ticker_24hr)
+        app.router.add_get("/fapi/v1/exchangeInfo", self._exchange_info)
+        app.router.add_post("/rest/v1/signals", self._insert)
+        app.router.add_get("/stream", self._stream)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        await self.drop_streams()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class FakeRedis:
+    """The slice of `RedisClient` used by dedup and the persister, kept in dicts."""
+
+    def __init__(self):
+        self._keys: Dict[str, float] = {}
+        self._lists: Dict[str, List[Dict[str, Any]]] = {}  # Redis list key -> payloads, oldest first
+
+    async def set_nx_many(self, keys: List[str], ttl: int) -> List[bool]:
+        now = time.monotonic()
+        out = []
+        for key in keys:
+            exp = self._keys.get(key)
+            fresh = exp is None or exp <= now
+            if fresh:
+                self._keys[key] = now + ttl
+            out.append(fresh)
+        return out
+
+    async def try_set(self, key: str, ttl: int = 3600, fail_open=None) -> bool:
+        return (await self.set_nx_many([key], ttl))[0]
+
+    async def queue_signal(self, payload: dict, key: str = "signals:outgoing") -> bool:
+        self._lists.setdefault(key, []).append(payload)
+        return True
+
+    async def pop_signal(self):
+        queue = self._lists.get("signals:outgoing")
+        return queue.pop(0) if queue else None
+
+    def items(self, key: str) -> List[Dict[str, Any]]:
+        return list(self._lists.get(key, []))
@@ -0,0 +1,336 @@
+"""
+Run the benchmarks, write results as JSON and compare them with a stored baseline.
+
+    python -m bench.run                      # run, write bench/results.json, compare
+    python -m bench.run --update-baseline    # run and store the result as the new baseline
+    python -m bench.run -k strategy --threshold 0.5
+
+Each case reports per-operation milliseconds (median, min, p90). A case regresses
+when its best round (min) exceeds the baseline's by more than --threshold (a fraction;
+the minimum is the figure least disturbed by other load on the machine);
+any regression makes the exit status 1. Baselines are machine-specific: refresh
+them on the machine that runs the comparison.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from . import fakes, synthetic  # noqa: F401  (sets placeholder env first)
+
+from app.config import settings
+from app.services import backtest, http, indicators, indicators_np
+from app.services.binance import BinanceClient, interval_ms
+from app.services.binance_ws import KlineStreamManager
+from app.services.dedup import Deduper
+from app.services.kline_array import KlineArray
+from app.services.kline_matrix import KlineMatrix
+from app.services.kline_store import KlineStore
+from app.services.persister import SignalPersister
+from app.services.rate_limiter import BinanceWeightLimiter
+from app.services.strategies.loader import load_all
+from app.services.supabase import SupabaseClient
+from app.services.universe import Universe
+from app.telegram import outbox
+from app import worker
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_OUT = os.path.join(HERE, "results.json")
+
+WINDOW = 300
+MATRIX_SYMBOLS = 200
+PAIRS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "LINKUSDT"]
+
+
+def _stats(samples: List[float], number: int) -> Dict[str, float]:
+    per_op = sorted(s * 1000 / number for s in samples)
+    return {
+        "median_ms": round(statistics.median(per_op), 4),
+        "min_ms": round(per_op[0], 4),
+        "p90_ms": round(per_op[min(len(per_op) - 1, int(len(per_op) * 0.9))], 4),
+        "rounds": len(per_op),
+        "number": number,
+    }
+
+
+def _autorange(fn: Callable[[], Any], min_round_s: float = 0.02) -> int:
+    """Calls per round so one round takes at least `min_round_s` (keeps timer noise out of tiny ops)."""
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - t0 >= min_round_s or number >= 1 << 16:
+            return number
+        number *= 2
+
+
+def bench_sync(fn: Callable[[], Any], repeat: int, number: int | None = None) -> Dict[str, float]:
+    fn()  # warm-up
+    number = number or _autorange(fn)
+    samples = []
+    # Like timeit: keep collector pauses out of the timed rounds
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append(time.perf_counter() - t0)
+    finally:
+        gc.enable()
+    return _stats(samples, number)
+
+
+async def bench_async(fn: Callable[[], Awaitable[Any]], repeat: int, number: int = 1,
+                      warmup: bool = True) -> Dict[str, float]:
+    if warmup:
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        samples.append(time.perf_counter() - t0)
+    return _stats(samples, number)
+
+
+def _sliding(rows: List[List[Any]]) -> Callable[[], List[List[Any]]]:
+    """Successive `WINDOW`-candle windows, one candle further each call (wraps around)."""
+    state = {"i": WINDOW}
+
+    def nxt():
+        i = state["i"]
+        state["i"] = i + 1 if i + 1 <= len(rows) else WINDOW
+        return rows[i - WINDOW:i]
+    return nxt
+
+
+def micro_cases(scale: int) -> Dict[str, Dict[str, float]]:
+    out: Dict[str, Dict[str, float]] = {}
+    rows = synthetic.klines(WINDOW, "5m", seed=1)
+    closes = indicators.close_prices(rows)
+    arr = KlineArray.from_rows(rows)
+    out["indicators.ema"] = bench_sync(lambda: indicators.ema(closes, 50), 30 * scale)
+    out["indicators.atr"] = bench_sync(lambda: indicators.atr(rows, 14), 30 * scale)
+    out["indicators_np.ema"] = bench_sync(lambda: indicators_np.ema(arr.close, 50), 30 * scale)
+    out["indicators_np.atr"] = bench_sync(lambda: indicators_np.atr(arr, 14), 30 * scale)
+
+    for name, strat in sorted(load_all().items()):
+        tf = getattr(strat, "timeframe", "5m")
+        symbol = "BTCUSDT"
+        history = synthetic.klines(WINDOW + 2000, tf, seed=2)
+        nxt = _sliding(history)
+        out[f"strategy.{name}.run"] = bench_sync(lambda: strat.run(nxt(), symbol), 20 * scale)
+
+        if hasattr(strat, "run_matrix"):
+            # Cross-sectional: MATRIX_SYMBOLS windows per call, against as many `run` calls
+            histories = {f"S{i}USDT": synthetic.klines(WINDOW + 500, tf, seed=100 + i) for i in range(MATRIX_SYMBOLS)}
+            steps = {sym: _sliding(rows) for sym, rows in histories.items()}
+            per_symbol = type(strat)()
+            out[f"strategy.{name}.run.x{MATRIX_SYMBOLS}"] = bench_sync(
+                lambda: [per_symbol.run(nxt(), sym) for sym, nxt in steps.items()], 10 * scale)
+            matrix_strat = type(strat)()
+            symbols = list(steps)
+            out[f"strategy.{name}.run_matrix.x{MATRIX_SYMBOLS}"] = bench_sync(
+                lambda: matrix_strat.run_matrix(KlineMatrix(symbols, [steps[sym]() for sym in symbols])), 10 * scale)
+
+        bt_rows = synthetic.klines(8640, tf, seed=3)  # one month of 5m candles
+        bt_arr = KlineArray.from_rows(bt_rows)
+        out[f"backtest_klines.{name}"] = bench_sync(
+            lambda: backtest.backtest_klines(strat, symbol, bt_rows, bt_arr), 7 * scale, 1)
+    return out
+
+
+async def ws_cases(exchange: fakes.FakeExchange, binance: BinanceClient, session, by_tf: Dict[str, list],
+                   scale: int) -> Dict[str, Dict[str, float]]:
+    """
+    KlineStreamManager against the stand-in stream: a final-candle event must run the
+    timeframe's strategies, and after a dropped connection the candles closed in the
+    meantime must come from the REST backfill. Either failing raises.
+    """
+    out: Dict[str, Dict[str, float]] = {}
+    tf = "5m" if "5m" in by_tf else next(iter(by_tf))
+    step = interval_ms(tf)
+    symbol = PAIRS[0]
+    store = KlineStore()
+    state: Dict[str, Any] = {"closed": asyncio.Event(), "window": None, "runs": 0}
+
+    async def on_closed(sym: str, interval: str, kl: List[List[Any]]):
+        series = store.series(sym, interval)
+        for strat in by_tf.get(interval, []):
+            worker._safe_evaluate(strat, sym, kl, series)
+            state["runs"] += 1
+        state["window"] = kl
+        state["closed"].set()
+
+    saved = settings.WS_RECONNECT_MAX_DELAY
+    settings.WS_RECONNECT_MAX_DELAY = 0.05
+    manager = KlineStreamManager(binance, session, [(symbol, tf)], on_closed, store=store, base=exchange.ws_url)
+    stop = asyncio.Event()
+    task = asyncio.create_task(manager.run(stop))
+    try:
+        await exchange.wait_streams(1)
+
+        async def close_event():
+            exchange.shift_ms += step  # next candle
+            state["closed"].clear()
+            runs = state["runs"]
+            row = await exchange.push_kline(symbol, tf, final=True)
+            await asyncio.wait_for(state["closed"].wait(), 5)
+            if state["window"][-1][0] != row[0] or (by_tf.get(tf) and state["runs"] == runs):
+                raise RuntimeError("candle-close event did not run the strategies")
+        out["ws.close_event"] = await bench_async(close_event, 20 * scale)
+
+        async def reconnect_backfill():
+            last = state["window"][-1][0]
+            # Three candles close while the stream is down; the client clock follows the exchange's
+            exchange.shift_ms += 3 * step
+            await binance.sync_time()
+            requests = exchange.requests
+            state["closed"].clear()
+            await exchange.drop_streams()
+            await asyncio.wait_for(state["closed"].wait(), 10)
+            opens = [int(k[0]) for k in state["window"][-4:]]
+            if exchange.requests == requests or opens[-1] <= last or any(b - a != step for a, b in zip(opens, opens[1:])):
+                raise RuntimeError("missed candles were not backfilled after the reconnect")
+            await exchange.wait_streams(1)
+        out["ws.reconnect_backfill"] = await bench_async(reconnect_backfill, 3 * scale)
+    finally:
+        stop.set()
+        await task
+        settings.WS_RECONNECT_MAX_DELAY = saved
+    return out
+
+
+async def e2e_cases(scale: int) -> Dict[str, Dict[str, float]]:
+    out: Dict[str, Dict[str, float]] = {}
+    exchange = fakes.FakeExchange(PAIRS)
+    url = await exchange.start()
+    saved = {k: getattr(settings, k) for k in ("BINANCE_BASE", "SUPABASE_URL", "KLINE_CACHE_ENABLED",
+                                               "BACKTEST_POOL_ENABLED")}
+    settings.BINANCE_BASE, settings.SUPABASE_URL = url, url
+    settings.KLINE_CACHE_ENABLED, settings.BACKTEST_POOL_ENABLED = False, False
+    try:
+        session = http.session()
+        limiter = BinanceWeightLimiter(limit_per_min=10 ** 9)
+        binance = BinanceClient(url, session, limiter=limiter)
+        redis = fakes.FakeRedis()
+        persister = SignalPersister(SupabaseClient(session), redis)
+        dedup = Deduper(redis)
+        kline_strats, ticker_strats = worker._split_strategies(load_all().values())
+        by_tf = worker._group_by_timeframe(kline_strats)
+        universe = Universe(binance)
+        sem = asyncio.Semaphore(int(getattr(settings, "WORKER_CONCURRENCY", 8)))
+        state = {"store": KlineStore()}
+
+        async def cycle():
+            store = state["store"]
+            results = await asyncio.gather(*(
+                worker._scan_series(binance, store, symbol, tf, strats, sem)
+                for tf, strats in by_tf.items() for symbol in PAIRS
+            ))
+            await worker._dispatch([c for r in results for c in r], dedup, persister)
+            await persister.flush()
+            outbox._queues.clear()
+
+        async def cold_cycle():
+            state["store"] = KlineStore()
+            await cycle()
+
+        out["worker.cycle_cold"] = await bench_async(cold_cycle, 5 * scale)
+        state["store"] = KlineStore()
+        out["worker.cycle_warm"] = await bench_async(cycle, 10 * scale)
+
+        async def ticker_cycle():
+            prices = await universe.prices()
+            candidates = [c for symbol in PAIRS for strat in ticker_strats
+                          for c in worker._guarded(worker._evaluate_ticker, strat, symbol, *prices[symbol])]
+            await worker._dispatch(candidates, dedup, persister)
+        out["worker.ticker_cycle"] = await bench_async(ticker_cycle, 20 * scale)
+        out.update(await ws_cases(exchange, binance, session, by_tf, scale))
+
+        for name, strat in sorted(load_all().items()):
+            tf = getattr(strat, "timeframe", "5m")
+
+            async def bt():
+                return await backtest.backtest_strategy(strat, "ETHUSDT", tf, months=1, strategy_name=name)
+            out[f"backtest_strategy.{name}"] = await bench_async(bt, 3 * scale)
+    finally:
+        for k, v in saved.items():
+            setattr(settings, k, v)
+        await http.close()
+        await exchange.stop()
+    return out
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    regressions = []
+    for name, cur in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            print(f"  {name:<44} {cur['min_ms']:>10.4f} ms   (new)")
+            continue
+        ratio = cur["min_ms"] / base["min_ms"] if base["min_ms"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<44} {cur['min_ms']:>10.4f} ms   x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.run", description=__doc__.split("\n\n")[0])
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("-k", dest="only", default="", help="only cases whose name contains this")
+    ap.add_argument("--scale", type=int, default=1, help="multiply the number of rounds")
+    ap.add_argument("--skip-e2e", action="store_true")
+    args = ap.parse_args(argv)
+
+    results = micro_cases(args.scale)
+    if not args.skip_e2e:
+        results.update(asyncio.run(e2e_cases(args.scale)))
+    if args.only:
+        results = {k: v for k, v in results.items() if args.only in k}
+
+    doc = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "cpus": os.cpu_count(), "created": int(time.time())},
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(doc, f, indent=2, sort_keys=True)
+        print(f"baseline written: {args.baseline} ({len(results)} cases)")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --update-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
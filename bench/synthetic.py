@@ -0,0 +1,39 @@
+"""Deterministic synthetic klines: a random walk with intraday session structure."""
+import math
+import random
+from typing import Any, List
+
+from app.services.binance import interval_ms
+
+# Volatility multiplier by UTC hour: quiet Asia, London open, NY open/overlap busiest
+_SESSION_VOL = [0.7] * 7 + [1.2] * 6 + [1.8] * 4 + [1.3] * 3 + [0.9] * 4
+
+
+def klines(n: int, interval: str = "5m", seed: int = 7, start_ms: int = 1_704_067_200_000,
+           price: float = 40_000.0, vol: float = 0.0015) -> List[List[Any]]:
+    """
+    `n` Binance REST kline rows (12 fields, prices as strings) starting at `start_ms`.
+
+    Returns are Gaussian with hour-of-day volatility and slowly switching drift
+    regimes, so trend/pullback and range-breakout strategies both see setups.
+    Same arguments, same rows.
+    """
+    rnd = random.Random(seed)
+    step = interval_ms(interval)
+    scale = math.sqrt(step / 300_000)
+    drift = 0.0
+    rows: List[List[Any]] = []
+    p = price
+    for i in range(n):
+        t = start_ms + i * step
+        if rnd.random() < 0.002:
+            drift = rnd.gauss(0, vol * 0.15)
+        sigma = vol * scale * _SESSION_VOL[(t // 3_600_000) % 24]
+        o = p
+        p = max(1e-6, p * (1 + drift + rnd.gauss(0, sigma)))
+        h = max(o, p) * (1 + abs(rnd.gauss(0, sigma * 0.5)))
+        low = min(o, p) * (1 - abs(rnd.gauss(0, sigma * 0.5)))
+        v = 100 * _SESSION_VOL[(t // 3_600_000) % 24] * (1 + rnd.random())
+        rows.append([t, f"{o:.2f}", f"{h:.2f}", f"{low:.2f}", f"{p:.2f}", f"{v:.3f}",
+                     t + step - 1, f"{v * p:.2f}", int(v * 10), f"{v / 2:.3f}", f"{v * p / 2:.2f}", "0"])
+    return rows
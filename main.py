@@ -7,9 +7,11 @@ from fastapi import FastAPI
 from app.api import app as fastapi_app
 from app.telegram import bot
 from app.config import settings
-from app.logging import setup_logging
+from app.logging import setup_logging, shutdown_logging
 from app.worker import run_worker
 from app.utils import get_public_ip
+from app.services import backtest_pool, http
+from app.services.backtest_jobs import backtest_jobs
 
 stop_event = asyncio.Event()
 worker_task = None
@@ -45,10 +47,14 @@ async def lifespan(app: FastAPI):
         stop_event.set()
         if worker_task:
             await worker_task
+        await backtest_jobs.stop()
+        backtest_pool.shutdown()
+        await http.close()
         try:
             await bot.delete_webhook()
         finally:
             await bot.session.close()
+            shutdown_logging()
 
 app = FastAPI(lifespan=lifespan)
 